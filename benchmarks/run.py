@@ -0,0 +1,159 @@
+"""Benchmarks of the wrapper against a local stand-in of the IMF's API (see `server.py`).
+
+Run from the repository's root, e.g.:
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --observations 500 --compare results.json
+
+Results are written as json (with the commit they were measured on), so they can be compared across commits.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from pathlib import Path
+from statistics import mean, median
+from time import perf_counter
+from typing import Callable
+
+from server import PayloadConfig, serve
+
+SRC = Path(__file__).resolve().parent.parent / 'src'
+
+
+def measure(name: str, func: Callable[[], object], repeat: int, items: int | None = None, setup: Callable[[], object] | None = None) -> dict:
+    """Time `func` `repeat` times (after `setup`, if any, which is not timed), with the throughput of `items` per second."""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = perf_counter()
+        func()
+        times.append(perf_counter() - start)
+
+    result = {'name': name, 'repeat': repeat, 'min': min(times), 'median': median(times), 'mean': mean(times)}
+    if items is not None:
+        result['items'] = items
+        result['throughput'] = items / median(times)
+
+    print(f"{name:<32} median {result['median'] * 1000:10.2f} ms" + (f"  ({result['throughput']:,.0f} items/s)" if items else ''),
+          file=sys.stderr)
+    return result
+
+
+def run(config: PayloadConfig, repeat: int, series: int, concurrency: int) -> list[dict]:
+    # Imported only now, as the base url is read on import
+    from wrapper import IMFWrapper
+    from client import IMFClient
+    from dataset import Dataset
+    from ratelimit import TokenBucket
+
+    def client() -> IMFClient:
+        return IMFClient(rate_limiter=TokenBucket(rate=1e9, burst=10**9), max_concurrency=concurrency)
+
+    def fresh_dataset(imf: IMFWrapper) -> Dataset:
+        Dataset._models.clear()
+        imf.invalidate_structure()
+        return imf.get_dataset('DS000')
+
+    def wrapper_startup() -> None:
+        # (wrappers leave the clients given to them open)
+        with client() as startup_client:
+            IMFWrapper(client=startup_client).close()
+
+    results = []
+    imf_client = client()
+    imf = IMFWrapper(client=imf_client)
+    dataset = imf.get_dataset('DS000')
+
+    # Startup and structures
+    results.append(measure('wrapper_startup', wrapper_startup, repeat))
+    results.append(measure('get_dataset', lambda: fresh_dataset(imf), repeat))
+
+    structure = imf.get_structures(['DS000'])['DS000']
+    results.append(measure('dataset_construction', lambda: Dataset('DS000', *structure).SeriesItemDynamic, repeat,
+                           setup=Dataset._models.clear))
+
+    # Parsing (of a single response, with `series` series)
+    areas = dataset.values_of('REF_AREA')[:series]
+    json_data = imf_client.get_json(dataset._build_urls((), {'FREQ': 'A', 'REF_AREA': areas, 'INDICATOR': 'IND_0000_XDC'}, '1900', '2100')[0])
+    observations = len(areas) * config.observations
+
+    parsed = dataset.CompactDataResponse.from_raw(json_data)
+    results.append(measure('from_raw', lambda: dataset.CompactDataResponse.from_raw(json_data), repeat, items=observations))
+    results.append(measure('to_dataframe', lambda: [item.to_dataframe() for item in parsed.series], repeat, items=observations))
+
+    for engine in ('pydantic', 'columnar'):
+        results.append(measure(f"parse_{engine}", lambda: dataset._to_dataframes([json_data], engine), repeat, items=observations))
+    results.append(measure('parse_columnar_periods', lambda: dataset._to_dataframes([json_data], 'columnar', periods='period'), repeat, items=observations))
+    results.append(measure('parse_columnar_long', lambda: dataset._to_dataframes([json_data], 'columnar', 'long'), repeat, items=observations))
+
+    # Concurrent fetching (of as many urls as areas, each with a single series)
+    urls = [url for area in areas for url in dataset._build_urls((), {'FREQ': 'A', 'REF_AREA': area, 'INDICATOR': 'IND_0000_XDC'}, '1900', '2100')]
+    results.append(measure('get_jsons', lambda: imf_client.get_jsons(urls), repeat, items=len(urls)))
+    results.append(measure('get_data', lambda: dataset.get_data(FREQ='A', REF_AREA=areas, INDICATOR='IND_0000_XDC', engine='columnar'),
+                           repeat, items=observations))
+
+    imf.close()
+    imf_client.close()
+    return results
+
+
+def commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list[dict], baseline_path: str) -> None:
+    """Print the ratio of each benchmark's median to the baseline's (below 1 is faster)."""
+    baseline = {result['name']: result for result in json.loads(Path(baseline_path).read_text())['results']}
+
+    print(f"\nCompared to {baseline_path}:", file=sys.stderr)
+    for result in results:
+        if (old := baseline.get(result['name'])) is not None:
+            print(f"{result['name']:<32} {result['median'] / old['median']:6.2f}x", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--datasets', type=int, default=PayloadConfig.datasets)
+    parser.add_argument('--areas', type=int, default=PayloadConfig.areas)
+    parser.add_argument('--indicators', type=int, default=PayloadConfig.indicators)
+    parser.add_argument('--observations', type=int, default=PayloadConfig.observations, help="observations per series")
+    parser.add_argument('--latency', type=float, default=PayloadConfig.latency, help="seconds added to every response")
+    parser.add_argument('--series', type=int, default=100, help="series per response, for the parsing benchmarks")
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="file to write the results to (printed if not given)")
+    parser.add_argument('--compare', help="results file to compare against")
+    args = parser.parse_args()
+
+    config = PayloadConfig(args.datasets, args.areas, args.indicators, args.observations, args.latency)
+
+    with serve(config) as base_url:
+        os.environ['IMF_BASE_URL'] = base_url
+        sys.path.insert(0, str(SRC))
+
+        results = run(config, args.repeat, min(args.series, args.areas), args.concurrency)
+
+    report = json.dumps({'commit': commit(),
+                         'python': platform.python_version(),
+                         'config': vars(config) | {'series': args.series, 'concurrency': args.concurrency},
+                         'results': results}, indent=1)
+
+    if args.output:
+        Path(args.output).write_text(report)
+    else:
+        print(report)
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""A local stand-in for the IMF's SDMX_JSON API, serving synthetic `/Dataflow`, `/DataStructure` and `/CompactData` payloads.
+
+The payloads' sizes are configurable - the number of datasets, of codes in each dimension, and of observations per series.
+`/CompactData` responses hold a series for every combination of the codes requested (the first code of each dimension
+requested without any), so the size of a response is driven by the request, as on the real API.
+"""
+
+import json
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import product
+from multiprocessing import Process, Queue
+from time import sleep
+from typing import Iterator
+from urllib.parse import urlsplit
+
+PREFIX = '/REST/SDMX_JSON.svc'
+
+
+@dataclass(frozen=True)
+class PayloadConfig:
+    datasets: int = 50
+    areas: int = 200
+    indicators: int = 1000
+    observations: int = 100
+    latency: float = 0.0  # seconds, added to every response
+
+    def codes(self) -> dict[str, list[str]]:
+        """Codes of the dimensions (and of the series attribute)."""
+        return {'FREQ': ['A', 'Q', 'M'],
+                'REF_AREA': [f"A{i:03d}" for i in range(self.areas)],
+                'INDICATOR': [f"IND_{i:04d}_XDC" for i in range(self.indicators)],
+                'UNIT_MULT': ['0', '3', '6']}
+
+    def dataflow(self) -> dict:
+        datasets = [{'Name': {'#text': f"Dataset {i}" + (' 2021' if i % 5 == 4 else '')}, 'KeyFamilyRef': {'KeyFamilyID': f"DS{i:03d}"}}
+                        for i in range(self.datasets)]
+        return {'Structure': {'Dataflows': {'Dataflow': datasets}}}
+
+    def data_structure(self) -> dict:
+        codelists = [{'@id': f"CL_{name}", 'Code': [{'@value': code, 'Description': {'#text': f"Description of {code}"}} for code in codes]}
+                        for name, codes in self.codes().items()]
+        concepts = [{'@id': name, 'Name': {'#text': name.title()}} for name in self.codes()]
+        concepts += [{'@id': 'TIME_PERIOD', 'Name': {'#text': 'Time'}, 'TextFormat': {'@textType': 'DateTime'}},
+                     {'@id': 'OBS_VALUE', 'Name': {'#text': 'Value'}, 'TextFormat': {'@textType': 'Double'}},
+                     {'@id': 'OBS_STATUS', 'Name': {'#text': 'Status'}, 'TextFormat': {'@textType': 'String'}}]
+
+        return {'Structure': {
+            'CodeLists': {'CodeList': codelists},
+            'Concepts': {'ConceptScheme': {'Concept': concepts}},
+            'KeyFamilies': {'KeyFamily': {
+                'Components': {
+                    'Dimension': [{'@conceptRef': name, '@codelist': f"CL_{name}"} for name in ('FREQ', 'REF_AREA', 'INDICATOR')],
+                    'TimeDimension': {'@conceptRef': 'TIME_PERIOD'},
+                    'PrimaryMeasure': {'@conceptRef': 'OBS_VALUE'},
+                    'Attribute': [{'@conceptRef': 'UNIT_MULT', '@codelist': 'CL_UNIT_MULT', '@attachmentLevel': 'Series'},
+                                  {'@conceptRef': 'OBS_STATUS'}]},
+                'Annotations': {'Annotation': [{'AnnotationTitle': 'Latest Update Date', 'AnnotationText': {'#text': '01/01/2023'}}]}}}}}
+
+    def compact_data(self, key: str) -> dict:
+        codes = self.codes()
+        args = [arg.split('+') if arg else codes[name][:1] for arg, name in zip(key.split('.'), ('FREQ', 'REF_AREA', 'INDICATOR'))]
+
+        series = [{'@FREQ': freq, '@REF_AREA': area, '@INDICATOR': indicator, '@UNIT_MULT': '6',
+                   'Obs': [{'@TIME_PERIOD': str(1900 + k), '@OBS_VALUE': str(k * 1.5)} for k in range(self.observations)]}
+                        for freq, area, indicator in product(*args)]
+
+        return {'CompactData': {'DataSet': {'Series': series[0] if len(series) == 1 else series}}}
+
+    @lru_cache(maxsize=1024)
+    def body(self, path: str) -> bytes | None:
+        """The (encoded) response to a path, or None if not found."""
+        match path.removeprefix(PREFIX).strip('/').split('/'):
+            case ['Dataflow']:
+                payload = self.dataflow()
+            case ['DataStructure', _]:
+                payload = self.data_structure()
+            case ['CompactData', _, key]:
+                payload = self.compact_data(key)
+            case _:
+                return None
+
+        return json.dumps(payload).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keeping connections alive, as the clients pool them
+    disable_nagle_algorithm = True  # (otherwise, each response on a kept alive connection waits for a delayed ack)
+    config: PayloadConfig
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+
+        if self.config.latency:
+            sleep(self.config.latency)
+
+        if (body := self.config.body(url.path)) is None:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve_forever(config: PayloadConfig, ports: Queue) -> None:
+    handler = type('Handler', (_Handler,), {'config': config})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+
+    ports.put(server.server_port)
+    server.serve_forever()
+
+
+@contextmanager
+def serve(config: PayloadConfig = PayloadConfig()) -> Iterator[str]:
+    """Serve the stand-in API on a free local port, yielding its base url. 
+    The server runs on its own process, so that it does not compete for the interpreter lock with the benchmarked clients."""
+    ports = Queue()
+    process = Process(target=_serve_forever, args=(config, ports), daemon=True)
+    process.start()
+
+    try:
+        yield f"http://127.0.0.1:{ports.get(timeout=30)}{PREFIX}"
+    finally:
+        process.terminate()
+        process.join()
@@ -0,0 +1,88 @@
+"""Module with the planning of batches of data requests, across datasets.
+
+A batch is planned up front: each request is validated against its dataset's structure and built into its urls, and the
+urls of all the requests are deduplicated (urls being canonical, the same arguments always build the same urls) - so
+identical requests (or identical shards of split ones) share their responses, while partially overlapping ones do not
+(e.g. requests of 'US', and of 'US' and 'PT', request 'US' twice). The wrappers then request all the distinct urls 
+concurrently, on their client (within its concurrency, and at its rate limiter's pace), and build each request's data 
+from its urls' responses.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Hashable, Mapping, TYPE_CHECKING
+
+from globals import ENGINES, OUTPUTS, PERIODS
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+    from dataset import Dataset
+
+
+@dataclass(frozen=True)
+class DataRequest:
+    """A request for data of a dataset, with the same arguments as its `get_data`."""
+    dataset_id: str
+    params: Mapping[str, str | list[str]] = field(default_factory=dict)
+    start: str = '1900'
+    end: str = '2100'
+    engine: str | None = None
+    output: str = 'series'
+    periods: str | None = None
+    shard_periods: bool | int = False
+
+    def __post_init__(self):
+        assert self.engine is None or self.engine in ENGINES, f"Engine {self.engine!r} not available. Use one of the following: {ENGINES}."
+        assert self.output in OUTPUTS, f"Output {self.output!r} not available. Use one of the following: {OUTPUTS}."
+        assert self.periods is None or self.periods in PERIODS, f"Periods {self.periods!r} not available. Use one of the following: {PERIODS}."
+        assert self.periods is None or self.output == 'series', "Periods can only index the series' dataframes (of `output='series'`)."
+        assert isinstance(self.shard_periods, bool) or (isinstance(self.shard_periods, int) and self.shard_periods > 0), \
+            f"Periods' sharding {self.shard_periods!r} not available. Use a boolean, or a number of years."
+
+    @classmethod
+    def of(cls, request: DataRequest | tuple) -> DataRequest:
+        """Get a request, given either as such or as a tuple of its fields (e.g. `('IFS', {'REF_AREA': 'US'})`)."""
+        return request if isinstance(request, cls) else cls(*request)
+
+
+@dataclass
+class BatchPlan:
+    """The (validated) requests of a batch, by their keys, with the urls each is built from."""
+    requests: dict[Hashable, DataRequest]
+    urls: dict[Hashable, list[str]]
+
+    @classmethod
+    def build(cls,
+              datasets: Mapping[str, Dataset],
+              requests: Mapping[Hashable, DataRequest]) -> BatchPlan:
+        """Validate the requests against their datasets' structures, and build their urls."""
+        urls = {}
+        for key, request in requests.items():
+            try:
+                urls[key] = datasets[request.dataset_id]._build_urls((), dict(request.params), request.start, request.end, request.shard_periods)
+            except AssertionError as exc:
+                raise AssertionError(f"Request {key!r} is invalid: {exc}") from None
+
+        return cls(dict(requests), urls)
+
+    @property
+    def unique_urls(self) -> list[str]:
+        """The distinct urls of all the requests (in the order of the requests)."""
+        return list(dict.fromkeys(url for urls in self.urls.values() for url in urls))
+
+    def results(self,
+                datasets: Mapping[str, Dataset],
+                json_data: Mapping[str, dict]) -> dict[Hashable, list[DataFrame] | DataFrame]:
+        """Build the data of each request from its urls' json data, by the requests' keys."""
+        results = {}
+        for key, request in self.requests.items():
+            dataset = datasets[request.dataset_id]
+            data = [json_data[url] for url in self.urls[key]]
+
+            results[key] = dataset._to_dataframes(dataset._stitch_series(data) if request.shard_periods else data,
+                                                  request.engine, request.output, request.periods)
+        return results
+
+    def __repr__(self):
+        return f"{type(self).__name__}({len(self.requests)} requests, {len(self.unique_urls)} urls)"
@@ -0,0 +1,293 @@
+"""Module with caches for the IMF API responses.
+
+Structure metadata on the IMF's API changes rarely (about monthly), so re-requesting and re-parsing it on every call
+is a waste of both time and the requests' limit. The disk cache keeps it on disk, in an already parsed form.
+
+Data responses change more often, but the same ones are often requested many times within a short period (e.g. by 
+several users of a server) - the response cache keeps them in memory for a while, and makes identical requests that
+are in flight at once share a single one.
+"""
+
+import asyncio
+import os
+import pickle
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from re import sub
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from time import monotonic, time
+from typing import Awaitable, Callable
+
+from globals import CACHE_DIR, STRUCTURE_CACHE_TTL, STRUCTURE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_BYTES
+from instrumentation import instruments
+
+import logging
+log = logging.getLogger(__name__)
+
+
+class DiskCache:
+    """A directory of pickled entries, each expiring `ttl` seconds after being set.
+
+    The directory is bounded to `max_bytes`, evicting the least recently used entries first.
+    """
+
+    SUFFIX = '.pickle'
+
+    def __init__(self,
+                 directory: str | Path = CACHE_DIR / 'structures',
+                 ttl: float | None = STRUCTURE_CACHE_TTL,
+                 max_bytes: int | None = STRUCTURE_CACHE_MAX_BYTES):
+
+        self.directory = Path(directory).expanduser()
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        self._lock = Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        """Get the path of the file for a given key (made safe for a filename)."""
+        return self.directory / (sub(r"[^\w.-]", '_', key) + self.SUFFIX)
+
+    def _is_expired(self, path: Path) -> bool:
+        return self.ttl is not None and time() - path.stat().st_mtime > self.ttl
+
+    def get(self, key: str, default: object = None) -> object:
+        """Get the value stored for a key, or `default` if missing, expired or unreadable."""
+        path = self._path(key)
+        cache = self.directory.name
+
+        try:
+            if self._is_expired(path):
+                log.debug(f"Cache entry {key!r} expired.")
+                path.unlink(missing_ok=True)
+                instruments.count('cache_misses', cache=cache)
+                return default
+
+            with open(path, 'rb') as file:
+                value = pickle.load(file)
+
+        except FileNotFoundError:
+            instruments.count('cache_misses', cache=cache)
+            return default
+
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as exc:
+            log.warning(f"Cache entry {key!r} could not be read ({exc!r}) - discarding it.")
+            path.unlink(missing_ok=True)
+            instruments.count('cache_misses', cache=cache)
+            return default
+
+        instruments.count('cache_hits', cache=cache)
+
+        # Mark entry as recently used (for eviction) - the access time tracks usage, the modification time tracks age
+        try:
+            os.utime(path, (time(), path.stat().st_mtime))
+        except FileNotFoundError:
+            pass
+        return value
+
+    def set(self, key: str, value: object) -> None:
+        """Store a value for a key, evicting old entries if the cache grows past its size limit."""
+        path = self._path(key)
+
+        # Write to a temporary file first (unique to this write, as several threads or processes may write the same key),
+        # so that readers never see partial entries
+        with NamedTemporaryFile(dir=self.directory, prefix=path.stem + '.', suffix='.tmp', delete=False) as file:
+            try:
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+            except BaseException:
+                file.close()
+                os.unlink(file.name)
+                raise
+
+        os.replace(file.name, path)
+
+        self._evict()
+
+    def invalidate(self, key: str | None = None) -> None:
+        """Remove the entry for a key, or all entries if no key is given."""
+        paths = [self._path(key)] if key is not None else self.directory.glob('*' + self.SUFFIX)
+
+        for path in paths:
+            path.unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        """Remove the least recently used entries until the cache fits its size limit."""
+        if self.max_bytes is None:
+            return
+
+        with self._lock:
+            entries = []
+            for path in self.directory.glob('*' + self.SUFFIX):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_atime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                log.debug(f"Evicting cache entry {path.stem!r}.")
+                path.unlink(missing_ok=True)
+                total -= size
+
+    def __contains__(self, key: str) -> bool:
+        path = self._path(key)
+        return path.exists() and not self._is_expired(path)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({str(self.directory)!r}, ttl={self.ttl}, max_bytes={self.max_bytes})"
+
+
+class ResponseCache:
+    """An in-memory cache of responses' contents, each expiring `ttl` seconds after being set.
+
+    The cache is bounded to `max_bytes` (of the responses' bodies), evicting the least recently used entries first.
+    Identical requests made at once (from threads, or from tasks) share a single request - the first one made.
+    """
+
+    def __init__(self,
+                 ttl: float | None = RESPONSE_CACHE_TTL,
+                 max_bytes: int | None = RESPONSE_CACHE_MAX_BYTES):
+
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        # Entries by key, as (value, size, expiration time), from least to most recently used
+        self._entries: OrderedDict[str, tuple[object, int, float]] = OrderedDict()
+        self._size = 0
+        self._lock = Lock()
+
+        # Requests in flight, by key
+        self._in_flight: dict[str, Future] = {}
+        self._async_in_flight: dict[str, asyncio.Future] = {}
+
+    def _get(self, key: str) -> tuple[bool, object]:
+        """Get whether a key is stored (and not expired), and its value - marking it as recently used. Requires the lock."""
+        if (entry := self._entries.get(key)) is None:
+            return False, None
+
+        value, size, expires = entry
+        if expires < monotonic():
+            del self._entries[key]
+            self._size -= size
+            return False, None
+
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _set(self, key: str, value: object, size: int) -> None:
+        with self._lock:
+            if (entry := self._entries.pop(key, None)) is not None:
+                self._size -= entry[1]
+
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+
+            self._entries[key] = (value, size, monotonic() + self.ttl if self.ttl is not None else float('inf'))
+            self._size += size
+
+            while self.max_bytes is not None and self._size > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+
+    def get(self, key: str, default: object = None) -> object:
+        with self._lock:
+            found, value = self._get(key)
+        return value if found else default
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], tuple[object, int]]) -> object:
+        """Get the value stored for a key or, if missing, fetch it (as its value and size) and store it - unless the same
+        key is already being fetched (by another thread), in which case its result is awaited instead."""
+        with self._lock:
+            found, value = self._get(key)
+            is_shared = not found and key in self._in_flight
+            if not (found or is_shared):
+                self._in_flight[key] = Future()
+            future = self._in_flight.get(key)
+
+        # (requests sharing one in flight count as hits)
+        instruments.count('cache_hits' if found or is_shared else 'cache_misses', cache='response')
+        if found:
+            return value
+        if is_shared:
+            return future.result()
+
+        try:
+            value, size = fetch()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            self._set(key, value, size)
+            future.set_result(value)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+        return value
+
+    async def aget_or_fetch(self, key: str, fetch: Callable[[], Awaitable[tuple[object, int]]]) -> object:
+        """Asynchronous version of `get_or_fetch`, sharing fetches between tasks (of the same event loop)."""
+        while True:
+            with self._lock:
+                found, value = self._get(key)
+            future = self._async_in_flight.get(key)
+
+            instruments.count('cache_hits' if found or future is not None else 'cache_misses', cache='response')
+            if found:
+                return value
+            if future is None:
+                break
+
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Only this task's own cancellation is raised - if the fetch was cancelled (with the task that made it), 
+                # it is made again
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        future = self._async_in_flight[key] = asyncio.get_running_loop().create_future()
+        # Mark the exception as retrieved, as no other task may be awaiting it
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+        try:
+            value, size = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            self._set(key, value, size)
+            future.set_result(value)
+        finally:
+            del self._async_in_flight[key]
+
+        return value
+
+    def invalidate(self, key: str | None = None) -> None:
+        """Remove the entry for a key, or all entries if no key is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._size = 0
+            elif (entry := self._entries.pop(key, None)) is not None:
+                self._size -= entry[1]
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return self._get(key)[0]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"{type(self).__name__}(ttl={self.ttl}, max_bytes={self.max_bytes}, entries={len(self)})"
@@ -0,0 +1,55 @@
+"""Module with the catalog of the datasets available on the IMF's API (as listed by `/Dataflow`).
+
+The catalog is parsed (and split into the datasets that correspond to a specific time period and the ones that do not)
+once per download, and can be persisted - along with the validators of the response it came from, so that it is only
+downloaded again when the IMF's list has actually changed.
+"""
+
+from dataclasses import dataclass, field, replace
+from re import search
+from time import time
+
+
+@dataclass(frozen=True)
+class DatasetCatalog:
+    """The datasets available, mapped to their descriptions - all of them, and partitioned by whether they are dated."""
+    datasets: dict[str, str]
+    dated: dict[str, str]
+    undated: dict[str, str]
+    etag: str | None = None
+    last_modified: str | None = None
+    fetched_at: float = field(default_factory=time)
+
+    @staticmethod
+    def has_date(description: str) -> bool:
+        """Check if a dataset description contains a date."""
+        return search(r"20\d{2}", description) is not None
+
+    @classmethod
+    def from_datasets(cls,
+                      datasets: dict[str, str],
+                      etag: str | None = None,
+                      last_modified: str | None = None) -> 'DatasetCatalog':
+        dated = {dataset_id: desc for dataset_id, desc in datasets.items() if cls.has_date(desc)}
+        undated = {dataset_id: desc for dataset_id, desc in datasets.items() if dataset_id not in dated}
+        return cls(datasets, dated, undated, etag, last_modified)
+
+    def is_stale(self, ttl: float | None) -> bool:
+        return ttl is not None and time() - self.fetched_at > ttl
+
+    def refreshed(self) -> 'DatasetCatalog':
+        """Get the same catalog, marked as just fetched (when the IMF's list has not changed)."""
+        return replace(self, fetched_at=time())
+
+    @property
+    def validators(self) -> dict[str, str]:
+        """Headers to request the list of datasets only if it changed since this catalog was fetched."""
+        headers = {}
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified is not None:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def __contains__(self, dataset_id: str) -> bool:
+        return dataset_id in self.datasets
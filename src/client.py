@@ -0,0 +1,290 @@
+"""Module with the (pooled) HTTP clients used for all requests to the IMF's API.
+
+Each client keeps a single connection pool open, and makes every request through the (shared) rate limiter - and, if 
+given a response cache, serves repeated requests from it (sharing identical ones in flight).
+
+Requests failing transiently are retried (per the client's retry policy), and fail at once while the client's circuit 
+breaker, if any, is open. Requests may also be hedged: if not answered within `hedge_after` seconds, a duplicate is made,
+and the first response is used.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from contextlib import contextmanager
+from time import sleep
+from typing import Iterable, Iterator
+from httpx import Client, AsyncClient, Limits, Response, Timeout
+
+from globals import BASE_URL, BASE_HEADERS, MAX_CONCURRENT_REQUESTS, REQUESTS_TIMEOUT
+from cache import ResponseCache
+from instrumentation import instruments, endpoint
+from ratelimit import TokenBucket, global_rate_limiter
+from resilience import RetryPolicy, CircuitBreaker, is_transient
+from utils import check_response, decode_json
+
+import logging
+log = logging.getLogger(__name__)
+
+
+class IMFClient:
+    """Client for the IMF's API, keeping its connections alive (pooled) between requests.
+
+    Requests may be made concurrently, from at most `max_concurrency` threads (which should fit the pool's `limits`).
+    Should be closed after use - either with `close`, or by using it as a context manager.
+    """
+
+    def __init__(self,
+                 rate_limiter: TokenBucket = global_rate_limiter,
+                 max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+                 limits: Limits | None = None,
+                 timeout: Timeout | float | None = REQUESTS_TIMEOUT,
+                 response_cache: ResponseCache | None = None,
+                 retry_policy: RetryPolicy | None = RetryPolicy(),
+                 circuit_breaker: CircuitBreaker | None = None,
+                 hedge_after: float | None = None):
+
+        self.rate_limiter = rate_limiter
+        self.max_concurrency = max_concurrency
+        self.response_cache = response_cache
+        self.retry_policy = retry_policy or RetryPolicy(attempts=1)
+        self.circuit_breaker = circuit_breaker
+        self.hedge_after = hedge_after
+        self._client = Client(base_url=BASE_URL, 
+                              headers=BASE_HEADERS, 
+                              limits=limits or Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+                              timeout=timeout)
+
+        # Threads for concurrent requests (of `get_jsons`), shared by all its calls
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        # Threads for hedged requests (both the original and its duplicate are made on them)
+        self._hedging_executor = ThreadPoolExecutor(max_workers=2 * max_concurrency) if hedge_after is not None else None
+
+    def _get_once(self, url: str, headers: dict[str, str] | None = None) -> Response:
+        """Make a request (once allowed by the rate limiter), and check its response."""
+        with instruments.span('rate_limit_wait'):
+            self.rate_limiter.acquire()
+
+        with instruments.span('request', endpoint=endpoint(url)):
+            response = self._client.get(url, headers=headers)
+
+        instruments.count('requests', endpoint=endpoint(url))
+        instruments.count('bytes', len(response.content), endpoint=endpoint(url))
+
+        check_response(response, self.rate_limiter)
+        return response
+
+    def _get_hedged(self, url: str, headers: dict[str, str] | None = None) -> Response:
+        """Make a request and, if not answered within `hedge_after` seconds, a duplicate - returning the first response
+        (the other is left to finish, and discarded)."""
+        first = self._hedging_executor.submit(self._get_once, url, headers)
+        try:
+            return first.result(timeout=self.hedge_after)
+        except FutureTimeoutError:
+            pass
+
+        instruments.count('hedged_requests', endpoint=endpoint(url))
+        second = self._hedging_executor.submit(self._get_once, url, headers)
+
+        for future in as_completed([first, second]):
+            if future.exception() is None:
+                return future.result()
+        return first.result()
+
+    def get(self, url: str, headers: dict[str, str] | None = None) -> Response:
+        """Make a request (once allowed by the rate limiter, and hedged if set to), and check its response - retrying
+        transient failures, per the retry policy."""
+        delays = self.retry_policy.delays()
+
+        while True:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.before_request()
+
+            try:
+                response = self._get_once(url, headers) if self.hedge_after is None else self._get_hedged(url, headers)
+            except Exception as exc:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record(exc)
+                if not is_transient(exc) or (delay := next(delays, None)) is None:
+                    raise
+
+                log.warning(f"Request to {url!r} failed ({exc!r}) - retrying in {delay:.2f} seconds.")
+                instruments.count('retries', endpoint=endpoint(url))
+                sleep(delay)
+            else:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record(None)
+                return response
+
+    def _fetch_json(self, url: str) -> tuple[dict, int]:
+        response = self.get(url)
+
+        with instruments.span('json_decode', endpoint=endpoint(url)):
+            return decode_json(response), len(response.content)
+
+    def get_json(self, url: str) -> dict:
+        """Request the url's json content - from the response cache, if any (which is then shared, so not to be modified)."""
+        if self.response_cache is None:
+            return self._fetch_json(url)[0]
+
+        return self.response_cache.get_or_fetch(url, lambda: self._fetch_json(url))
+
+    @contextmanager
+    def stream(self, url: str) -> Iterator[Response]:
+        """Make a request (once allowed by the rate limiter) whose body is streamed, and check its response.
+        As its body may be partially consumed, the request is not retried (nor hedged)."""
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before_request()
+
+        with instruments.span('rate_limit_wait'):
+            self.rate_limiter.acquire()
+
+        with self._client.stream('GET', url) as response:
+            instruments.count('requests', endpoint=endpoint(url))
+            try:
+                check_response(response, self.rate_limiter)
+            except Exception as exc:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record(exc)
+                raise
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record(None)
+            yield response
+
+    def get_jsons(self, urls: Iterable[str]) -> list[dict]:
+        """Request the urls concurrently (on a pool of threads), returning their json contents in order."""
+        urls = list(urls)
+        if len(urls) == 1:
+            return [self.get_json(urls[0])]
+
+        return list(self._executor.map(self.get_json, urls))
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._hedging_executor is not None:
+            self._hedging_executor.shutdown(wait=False, cancel_futures=True)
+        self._client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncIMFClient:
+    """Asynchronous client for the IMF's API, with at most `max_concurrency` requests in flight.
+
+    Should be closed after use - either with `aclose`, or by using it as an async context manager.
+    """
+
+    def __init__(self,
+                 rate_limiter: TokenBucket = global_rate_limiter,
+                 max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+                 limits: Limits | None = None,
+                 timeout: Timeout | float | None = REQUESTS_TIMEOUT,
+                 response_cache: ResponseCache | None = None,
+                 retry_policy: RetryPolicy | None = RetryPolicy(),
+                 circuit_breaker: CircuitBreaker | None = None,
+                 hedge_after: float | None = None):
+
+        self.rate_limiter = rate_limiter
+        self.max_concurrency = max_concurrency
+        self.response_cache = response_cache
+        self.retry_policy = retry_policy or RetryPolicy(attempts=1)
+        self.circuit_breaker = circuit_breaker
+        self.hedge_after = hedge_after
+        self._client = AsyncClient(base_url=BASE_URL, 
+                                   headers=BASE_HEADERS,
+                                   limits=limits or Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+                                   timeout=timeout)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _get_once(self, url: str, headers: dict[str, str] | None = None) -> Response:
+        """Make a request (once allowed by the rate limiter), and check its response."""
+        async with self._semaphore:
+            with instruments.span('rate_limit_wait'):
+                await self.rate_limiter.aacquire()
+
+            with instruments.span('request', endpoint=endpoint(url)):
+                response = await self._client.get(url, headers=headers)
+
+        instruments.count('requests', endpoint=endpoint(url))
+        instruments.count('bytes', len(response.content), endpoint=endpoint(url))
+
+        check_response(response, self.rate_limiter)
+        return response
+
+    async def _get_hedged(self, url: str, headers: dict[str, str] | None = None) -> Response:
+        """Make a request and, if not answered within `hedge_after` seconds, a duplicate - returning the first response
+        (the other is cancelled)."""
+        tasks = [asyncio.create_task(self._get_once(url, headers))]
+        done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+
+        if not done:
+            instruments.count('hedged_requests', endpoint=endpoint(url))
+            tasks.append(asyncio.create_task(self._get_once(url, headers)))
+
+        try:
+            for task in asyncio.as_completed(tasks):
+                try:
+                    return await task
+                except Exception as exc:
+                    error = exc
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def get(self, url: str, headers: dict[str, str] | None = None) -> Response:
+        """Make a request (once allowed by the rate limiter, and hedged if set to), and check its response - retrying
+        transient failures, per the retry policy."""
+        delays = self.retry_policy.delays()
+
+        while True:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.before_request()
+
+            try:
+                response = await (self._get_once(url, headers) if self.hedge_after is None else self._get_hedged(url, headers))
+            except Exception as exc:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record(exc)
+                if not is_transient(exc) or (delay := next(delays, None)) is None:
+                    raise
+
+                log.warning(f"Request to {url!r} failed ({exc!r}) - retrying in {delay:.2f} seconds.")
+                instruments.count('retries', endpoint=endpoint(url))
+                await asyncio.sleep(delay)
+            else:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record(None)
+                return response
+
+    async def _fetch_json(self, url: str) -> tuple[dict, int]:
+        response = await self.get(url)
+
+        with instruments.span('json_decode', endpoint=endpoint(url)):
+            return decode_json(response), len(response.content)
+
+    async def get_json(self, url: str) -> dict:
+        """Request the url's json content - from the response cache, if any (which is then shared, so not to be modified)."""
+        if self.response_cache is None:
+            return (await self._fetch_json(url))[0]
+
+        return await self.response_cache.aget_or_fetch(url, lambda: self._fetch_json(url))
+
+    async def get_jsons(self, urls: Iterable[str]) -> list[dict]:
+        """Request the urls concurrently, returning their json contents in order."""
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(self.get_json(url)) for url in urls]
+
+        return [task.result() for task in tasks]
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
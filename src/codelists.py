@@ -0,0 +1,96 @@
+"""Module with the registry of codelists shared by all datasets.
+
+Codelists (e.g. of areas, frequencies or unit multipliers) are the same across most of the IMF's datasets, so a process
+holding many datasets would keep many copies of them - and of the types and lookups built from them. Instead, codelists
+are interned by their contents into a single immutable `Codelist` per distinct version (with their codes as interned
+strings), which the attributes, the data models and the parsers of every dataset then reference. Codelists are also
+interned when unpickled (e.g. from the structure cache), and released once no dataset uses them.
+"""
+
+from functools import cached_property
+from hashlib import sha1
+from sys import intern
+from threading import Lock
+from typing import Literal, Mapping
+from weakref import WeakValueDictionary
+
+
+class Codelist(dict[str, str]):
+    """An immutable mapping of codes to their descriptions - to be created only by the registry (`codelists.intern`)."""
+
+    def __init__(self, codes: Mapping[str, str], digest: str):
+        super().__init__(codes)
+        self.digest = digest
+
+    @cached_property
+    def literal(self) -> type:
+        """The `Literal` type of the codes (for the data models)."""
+        return Literal[tuple(self)]
+
+    @cached_property
+    def positions(self) -> dict[str, int]:
+        """The position of each code in the codelist (for categoricals)."""
+        return {code: i for i, code in enumerate(self)}
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is immutable (it is shared by all datasets using it).")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _immutable
+
+    # (being immutable, copies are the codelist itself, and unpickled ones are interned into the shared one)
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return _intern, (dict(self),)
+
+    __hash__ = object.__hash__
+
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, value: object) -> 'Codelist':
+        """Pydantic validator, interning mappings into the shared codelists."""
+        if not isinstance(value, Mapping):
+            raise TypeError("A codelist must be a mapping of codes to their descriptions.")
+        return codelists.intern(value)
+
+
+class CodelistRegistry:
+    """Registry of the distinct codelists, by a digest of their contents - keeping each only while it is referenced."""
+
+    def __init__(self):
+        self._codelists: WeakValueDictionary[str, Codelist] = WeakValueDictionary()
+        self._lock = Lock()
+
+    def intern(self, codes: Mapping[str, str]) -> Codelist:
+        """Get the shared codelist with the given codes and descriptions (registering it, if it is the first)."""
+        if isinstance(codes, Codelist):
+            return codes
+
+        items = [(intern(code), desc) for code, desc in codes.items()]
+        digest = sha1(repr(items).encode()).hexdigest()
+
+        with self._lock:
+            if (codelist := self._codelists.get(digest)) is None:
+                codelist = self._codelists[digest] = Codelist(items, digest)
+            return codelist
+
+    def __len__(self):
+        return len(self._codelists)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({len(self)} codelists)"
+
+
+def _intern(codes: Mapping[str, str]) -> Codelist:
+    return codelists.intern(codes)
+
+
+# Codelists shared by all datasets
+codelists = CodelistRegistry()
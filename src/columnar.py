@@ -0,0 +1,127 @@
+"""Module with the columnar parsing engine for `/CompactData` responses.
+
+Instead of validating every observation into a (dynamic) pydantic model, and then dumping them back into dicts, the raw
+series are walked once, building each observation attribute's column straight into arrays - `Double` attributes as
+`float64` arrays, the others as (interned) strings. Series attributes are still validated against the dataset's codelists.
+
+The series can also be built into a single long dataframe (one row per observation), with the series attributes as
+categorical columns over the dataset's codelists.
+"""
+
+from sys import intern
+from typing import Iterable, Iterator
+import numpy as np
+from pandas import Categorical, DataFrame
+
+from exceptions import WrapperException
+from codelists import Codelist
+from models.dataset import Attribute
+from periods import period_index
+
+
+class ColumnarParser:
+    """Parses `/CompactData` json data into dataframes, for a dataset with the given series and observation attributes."""
+
+    def __init__(self,
+                 series_attrs: Iterable[Attribute],
+                 obs_attrs: Iterable[Attribute]):
+
+        # Allowed values for each series attribute, mapped to their position in the codelist (None if not restricted to one)
+        self.series_codes = {attr.name: attr.values.positions if isinstance(attr.values, Codelist) else None
+                                for attr in series_attrs}
+
+        # Whether each observation attribute is numeric
+        self.obs_numeric = {attr.name: attr.values == 'Double' for attr in obs_attrs}
+
+    @staticmethod
+    def series(json: dict) -> list[dict]:
+        """Extract the raw series from the json data."""
+        match json:
+            case {"CompactData": {"DataSet": {"Series": series}}}:
+                return series if isinstance(series, list) else [series]
+            case {"CompactData": {"DataSet": _}}:
+                return []
+            case _:
+                raise WrapperException("Invalid json response.")
+
+    def series_attrs(self, item: dict) -> dict[str, str | None]:
+        """Get (and validate) the attributes of a raw series."""
+        attrs = {}
+        for name, codes in self.series_codes.items():
+            value = item.get('@' + name)
+
+            if value is not None:
+                if codes is not None and value not in codes:
+                    raise WrapperException(f"Value {value!r} for {name!r} is not in the dataset's codelist.")
+                value = intern(value)
+
+            attrs[name] = value
+
+        return attrs
+
+    @staticmethod
+    def obs(item: dict) -> list[dict]:
+        """Extract the raw observations from a raw series."""
+        obs = item.get('Obs', [])
+        return obs if isinstance(obs, list) else [obs]
+
+    def obs_columns(self, item: dict) -> dict[str, np.ndarray | list]:
+        """Build the observation attributes' columns of a raw series."""
+        obs = self.obs(item)
+
+        columns = {}
+        for name, numeric in self.obs_numeric.items():
+            key = '@' + name
+
+            if numeric:
+                columns[name] = np.array([o.get(key, 'nan') for o in obs], dtype=np.float64)
+            else:
+                columns[name] = [intern(v) if (v := o.get(key)) is not None else None for o in obs]
+
+        return columns
+
+    def to_dataframe(self, item: dict, periods: str | None = None) -> DataFrame:
+        """Build the dataframe of a raw series, with its attributes set as the dataframe's `attrs` - indexed by its periods,
+        if `periods` is given (see `periods.period_index`)."""
+        columns, attrs = self.obs_columns(item), self.series_attrs(item)
+        index = period_index(columns.pop('TIME_PERIOD'), attrs.get('FREQ'), periods) if periods is not None else None
+        
+        dataframe = DataFrame(columns, index=index)
+        dataframe.attrs.update(attrs)
+        return dataframe
+
+    def to_long_dataframe(self, items: Iterable[dict]) -> DataFrame:
+        """Build a single dataframe of raw series, with a row per observation - the series attributes (as categoricals)
+        followed by the observation attributes."""
+        items = list(items)
+        attrs = [self.series_attrs(item) for item in items]
+        obs = [self.obs(item) for item in items]
+
+        # Number of rows of each series, by which its attributes are repeated
+        sizes = np.fromiter(map(len, obs), dtype=np.intp, count=len(items))
+
+        columns = {}
+        for name, codes in self.series_codes.items():
+            if codes is not None:
+                series_codes = np.fromiter((-1 if (value := series_attrs[name]) is None else codes[value] for series_attrs in attrs),
+                                           dtype=np.int32, count=len(items))
+                columns[name] = Categorical.from_codes(np.repeat(series_codes, sizes), categories=list(codes))
+            else:
+                columns[name] = np.repeat(np.array([series_attrs[name] for series_attrs in attrs], dtype=object), sizes)
+
+        for name, numeric in self.obs_numeric.items():
+            key = '@' + name
+
+            if numeric:
+                columns[name] = np.fromiter((o.get(key, 'nan') for series_obs in obs for o in series_obs),
+                                            dtype=np.float64, count=int(sizes.sum()))
+            else:
+                columns[name] = [intern(v) if (v := o.get(key)) is not None else None for series_obs in obs for o in series_obs]
+
+        return DataFrame(columns)
+
+    def iter_dataframes(self, json: dict, periods: str | None = None) -> Iterator[DataFrame]:
+        return (self.to_dataframe(item, periods) for item in self.series(json))
+
+    def to_dataframes(self, json: dict, periods: str | None = None) -> list[DataFrame]:
+        return list(self.iter_dataframes(json, periods))
@@ -1,18 +1,35 @@
+from __future__ import annotations
+
 from collections import OrderedDict
-from pandas import DataFrame
-import httpx
+from datetime import date
+from functools import cached_property
+from hashlib import sha1
+from math import prod
+from typing import Iterator, TYPE_CHECKING
 from makefun import create_function
 
-from globals import MAX_URL_SIZE, BASE_URL
+from globals import MAX_URL_SIZE, ENGINES, DEFAULT_ENGINE, OUTPUTS, PERIODS, MAX_OBSERVATIONS_PER_REQUEST, OBSERVATIONS_PER_YEAR
+from exceptions import WrapperException
 from url import URLFactory
-from models.dataset import Attribute
-from models.api import CompactDataResponse, SeriesItem
+from ratelimit import global_rate_limiter
+from client import IMFClient, AsyncIMFClient
+from instrumentation import instruments
+from streaming import iter_series
 from utils import is_non_string_iterable
 
+# Data dependencies (pandas, pydantic) are only imported once data is parsed
+if TYPE_CHECKING:
+    from pandas import DataFrame
+    from models.dataset import Attribute
+    from models.api import CompactDataResponse, SeriesItem
+    from columnar import ColumnarParser
+    from store import SeriesStore, RefreshReport, ParquetStore
+
 
 class Dataset:
     
-    MAX_URL_SIZE = MAX_URL_SIZE - len(BASE_URL)
+    # Data models (and parsers) by a digest of the structure they were created for
+    _models: dict[str, tuple[type[SeriesItem], type[CompactDataResponse], ColumnarParser]] = {}
     
     def __init__(self, 
                  dataset_id: str,
@@ -24,6 +41,10 @@ class Dataset:
         
         # Set direct information
         self.id = dataset_id
+        self._client = kwargs.get('client')
+        self._async_client = kwargs.get('async_client')
+        self._rate_limiter = getattr(self._client or self._async_client, 'rate_limiter', global_rate_limiter)
+        self.engine = kwargs.get('engine', DEFAULT_ENGINE)
         
         # Set general info based on annotations
         self.info = annotations
@@ -43,21 +64,194 @@ class Dataset:
         self._series_attrs_info = {attr.name: attr for attr in series_attrs}
         self.series_attrs = tuple(attr.name for attr in series_attrs)
         
-        # Create data model for the series in the dataset and the expected response
-        series_attrs_types = {attr.name: attr.as_type() for attr in [*parameters, *series_attrs]}
-        obs_attrs_types = {attr.name: attr.as_type() for attr in observation_attrs}
+        # Redefine signature of get_data methods to match the parameters
+        parameters_signature = [param + '=None' for param in self.parameters]
+        signature = ', '.join([*parameters_signature, '*', "start='1900'", "end='2100'", 'engine=None'])
+        self.get_data = create_function(f"get_data({signature}, output='series', periods=None, shard_periods=False)", self.get_data)
+        self.aget_data = create_function(f"aget_data({signature}, output='series', periods=None, shard_periods=False)", self.aget_data)
+        self.iter_data = create_function(f"iter_data({signature}, periods=None)", self.iter_data)
+        refresh_signature = ', '.join(['store', *parameters_signature, '*', "end='2100'", 'engine=None'])
+        self.refresh = create_function(f"refresh({refresh_signature})", self.refresh)
+        query_signature = ', '.join(['store', *parameters_signature, '*', "start='1900'", "end='2100'", "output='series'"])
+        self.query = create_function(f"query({query_signature})", self.query)
         
-        self.SeriesItemDynamic = SeriesItem.with_fields(obs_attrs_types, series_attrs_types)
-        self.CompactDataResponse = CompactDataResponse[self.SeriesItemDynamic]
+    @cached_property
+    def _dataset_models(self) -> tuple[type[SeriesItem], type[CompactDataResponse], ColumnarParser]:
+        """Data model for the series in the dataset and the expected response, and the columnar parser (an alternative 
+        to the data model) - created on first use, and shared by all datasets with the same structure."""
+        return self._get_models(list(self._parameters_info.values()), 
+                                list(self._obs_attrs_info.values()), 
+                                list(self._series_attrs_info.values()))
+    
+    @property
+    def SeriesItemDynamic(self) -> type[SeriesItem]:
+        return self._dataset_models[0]
+    
+    @property
+    def CompactDataResponse(self) -> type[CompactDataResponse]:
+        return self._dataset_models[1]
+    
+    @property
+    def _columnar_parser(self) -> ColumnarParser:
+        return self._dataset_models[2]
     
-        # Redefine signature of get_data method to match the parameters
-        self.get_data = create_function(f"get_data({', '.join(param + '=None' for param in self.parameters)})", self.get_data)
+    @classmethod
+    def _get_models(cls,
+                    parameters: list[Attribute],
+                    observation_attrs: list[Attribute],
+                    series_attrs: list[Attribute]) -> tuple[type[SeriesItem], type[CompactDataResponse], ColumnarParser]:
+        """Get the models (and parser) for a dataset structure, creating them only if no dataset with the same structure did."""
+        # (codelists are keyed by their digest, rather than their - possibly large - contents)
+        components = [[(attr.name, getattr(attr.values, 'digest', attr.values)) for attr in attrs] 
+                          for attrs in (parameters, observation_attrs, series_attrs)]
+        key = sha1(repr(components).encode()).hexdigest()
         
-    def get_data(self, *args, **kwargs) -> list[DataFrame]:
+        if (models := cls._models.get(key)) is None:
+            from models.api import CompactDataResponse, SeriesItem
+            from columnar import ColumnarParser
+            
+            series_attrs_types = {attr.name: attr.as_type() for attr in [*parameters, *series_attrs]}
+            obs_attrs_types = {attr.name: attr.as_type() for attr in observation_attrs}
+            
+            SeriesItemDynamic = SeriesItem.with_fields(obs_attrs_types, series_attrs_types)
+            models = cls._models.setdefault(key, (SeriesItemDynamic, 
+                                                  CompactDataResponse[SeriesItemDynamic], 
+                                                  ColumnarParser([*parameters, *series_attrs], observation_attrs)))
+        return models
+    
+    def get_data(self, *args, start: str = '1900', end: str = '2100', engine: str | None = None, output: str = 'series', periods: str | None = None, shard_periods: bool | int = False, **kwargs) -> list[DataFrame] | DataFrame:
         """Get data from the dataset with the given arguments to parameters. 
         Note that:
             * For some datasets the arguments are required, and the IMF API is not explicit about which.
-            * There is an upper limit on the size of the url that can be requested."""
+            * Only the observations from `start` to `end` (as periods, e.g. '2020', '2020-03') are requested.
+            * There is an upper limit on the size of the url that can be requested, so arguments that exceed it 
+              are split into several requests (made concurrently) whose results are merged.
+        The responses are parsed with the given `engine` (defaulting to the dataset's `engine`): either 'pydantic', validating
+        every observation into a data model, or 'columnar', building the columns directly (much faster on large responses).
+        The data is output either as a list of dataframes, one per series, with the series attributes on their `attrs` 
+        (`output='series'`), or as a single dataframe with a row per observation (`output='long'`) - with the parameters and 
+        series attributes as categorical columns, followed by the observation attributes.
+        The series' dataframes can be indexed by their periods, parsed by their frequency: as a `PeriodIndex` 
+        (`periods='period'`), or as the `DatetimeIndex` of the periods' starts (`periods='timestamp'`).
+        Large requests can also be split by their periods (`shard_periods`): into shards of decades or years, as estimated
+        from the number of observations they may have (if True), or of a given number of years - whose series are then 
+        stitched back together, in order."""
+        with instruments.span('get_data', dataset=self.id):
+            urls = self._build_urls(args, kwargs, start, end, shard_periods)
+            
+            # Get data (concurrently), on a temporary client if the dataset has none
+            if self._client is not None:
+                json_data = self._client.get_jsons(urls)
+            else:
+                with IMFClient(rate_limiter=self._rate_limiter) as client:
+                    json_data = client.get_jsons(urls)
+            
+            return self._to_dataframes(self._stitch_series(json_data) if shard_periods else json_data, engine, output, periods)
+    
+    async def aget_data(self, *args, start: str = '1900', end: str = '2100', engine: str | None = None, output: str = 'series', periods: str | None = None, shard_periods: bool | int = False, **kwargs) -> list[DataFrame] | DataFrame:
+        """Asynchronous version of `get_data`, using the wrapper's client if the dataset was created by an `AsyncIMFWrapper`."""
+        with instruments.span('get_data', dataset=self.id):
+            urls = self._build_urls(args, kwargs, start, end, shard_periods)
+            
+            # Get data (concurrently), on a temporary client if the dataset has none
+            if self._async_client is not None:
+                json_data = await self._async_client.get_jsons(urls)
+            else:
+                async with AsyncIMFClient(rate_limiter=self._rate_limiter) as client:
+                    json_data = await client.get_jsons(urls)
+            
+            return self._to_dataframes(self._stitch_series(json_data) if shard_periods else json_data, engine, output, periods)
+    
+    def iter_data(self, *args, start: str = '1900', end: str = '2100', engine: str | None = None, periods: str | None = None, **kwargs) -> Iterator[DataFrame]:
+        """Streaming version of `get_data`, yielding a dataframe per series as each is parsed from the (streamed) responses.
+        Memory is then bounded by the largest series, rather than by the whole response. Requires the `ijson` package."""
+        urls = self._build_urls(args, kwargs, start, end)
+        
+        # Stream the responses, on a temporary client if the dataset has none
+        client = self._client or IMFClient(rate_limiter=self._rate_limiter)
+        
+        try:
+            for url in urls:
+                with client.stream(url) as response:
+                    for item in iter_series(response.iter_bytes()):
+                        yield self._series_to_dataframe(item, engine, periods)
+        finally:
+            if client is not self._client:
+                client.close()
+    
+    def _series_to_dataframe(self, item: dict, engine: str | None = None, periods: str | None = None) -> DataFrame:
+        """Parse (and assert consistency of) a raw series into a dataframe."""
+        assert periods is None or periods in PERIODS, f"Periods {periods!r} not available. Use one of the following: {PERIODS}."
+        
+        match engine or self.engine:
+            case 'pydantic':
+                with instruments.span('validation', dataset=self.id):
+                    series = self.SeriesItemDynamic.parse_obj(item)
+                with instruments.span('dataframe', dataset=self.id):
+                    return series.to_dataframe(periods)
+            case 'columnar':
+                with instruments.span('dataframe', dataset=self.id):
+                    return self._columnar_parser.to_dataframe(item, periods)
+            case _ as engine:
+                raise WrapperException(f"Engine {engine!r} not available. Use one of the following: {ENGINES}.")
+    
+    def refresh(self, store: SeriesStore, *args, end: str = '2100', engine: str | None = None, **kwargs) -> RefreshReport:
+        """Refresh the series with the given arguments to parameters in a local `store`, requesting only the periods 
+        after the last ones stored of each series (or the whole history, if none of the series is stored).
+        The new observations are merged into the stored series (replacing revised ones), reporting what changed."""
+        params = self._build_params(args, kwargs)
+        last_periods = store.last_periods(self.id, params)
+        
+        if not last_periods:
+            dataframes = self.get_data(**params, start='1900', end=end, engine=engine)
+            return store.merge(self.id, self.parameters, dataframes, '1900')
+        
+        # Group the stored series by the year of their last periods (periods are compared within their year, since the
+        # IMF's API expects the same period format for all series), each group requested from its own year
+        groups: dict[str, set[str]] = {}
+        for key, period in last_periods.items():
+            groups.setdefault(period[:4], set()).add(key)
+        *earlier, latest = sorted(groups)
+        
+        # Unless all the series matching the arguments are stored, the latest group is requested with the arguments 
+        # themselves - so that series not stored yet (e.g. newly matching a wildcard argument) are found
+        is_complete = all(any(args) for args in params.values()) and \
+            prod(len(set(args)) for args in params.values()) == len(last_periods)
+        
+        dataframes = []
+        for start in (sorted(groups) if is_complete else earlier):
+            dataframes += self._refresh_group(store, groups[start], start, end, engine)
+        
+        new_keys = set()
+        if not is_complete:
+            for dataframe in self.get_data(**params, start=latest, end=end, engine=engine):
+                if (key := store.series_key(dataframe, self.parameters)) in groups[latest]:
+                    dataframes.append(dataframe)
+                elif key not in last_periods:
+                    new_keys.add(key)
+        
+        # Series not stored yet are requested again, with their whole history (which would otherwise be truncated at the 
+        # latest group's year, and never backfilled)
+        if new_keys:
+            dataframes += self._refresh_group(store, new_keys, '1900', end, engine)
+        
+        return store.merge(self.id, self.parameters, dataframes, min(groups))
+    
+    def _refresh_group(self, store: SeriesStore, keys: set[str], start: str, end: str, engine: str | None) -> list[DataFrame]:
+        """Request the series with the given keys from `start` (with the arguments of all the keys, so only keeping theirs)."""
+        params = {param: sorted({key.split('.')[i] for key in keys}) for i, param in enumerate(self.parameters)}
+        return [dataframe for dataframe in self.get_data(**params, start=start, end=end, engine=engine)
+                    if store.series_key(dataframe, self.parameters) in keys]
+    
+    def query(self, store: ParquetStore, *args, start: str = '1900', end: str = '2100', output: str = 'series', **kwargs) -> list[DataFrame] | DataFrame:
+        """Query the data stored in a local parquet `store` (written by its `write`, or by a `DatasetExtractor`) offline, with
+        the same arguments and output as `get_data` - reading only the partitions and row groups that match them."""
+        assert output in OUTPUTS, f"Output {output!r} not available. Use one of the following: {OUTPUTS}."
+        
+        return store.read(self, self._build_params(args, kwargs), start, end, output)
+    
+    def _build_params(self, args: tuple, kwargs: dict) -> OrderedDict[str, list[str]]:
+        """Validate the arguments to parameters, and map each parameter to its arguments."""
         # Assert parameters are valid
         for param in kwargs.keys():
             assert param in self.parameters, f"Parameter {param!r} not available for this dataset. Use one of the following: {self.parameters}."
@@ -65,25 +259,106 @@ class Dataset:
         # Build parameters arguments
         params = OrderedDict()
         for i, param in enumerate(self.parameters):
-            args = kwargs.get(param) or (args[i] if i < len(args) else '')
-            params[param] = args if is_non_string_iterable(args) else [args]
+            param_args = kwargs.get(param) or (args[i] if i < len(args) else '')
+            params[param] = param_args if is_non_string_iterable(param_args) else [param_args]
     
         # Assert parameters' arguments are valid
         for key, values in params.items():
             for value in values:
                 assert not value or value in self._parameters_info[key].values, f"Value {value!r} not available for parameter {key!r}."
         
-        # Build url
-        url = URLFactory.compact_data(self.id, params.values())
+        return params
+    
+    def _build_urls(self, args: tuple, kwargs: dict, start: str = '1900', end: str = '2100', shard_periods: bool | int = False) -> list[str]:
+        """Validate the arguments to parameters, and build the urls requesting them."""
+        params = self._build_params(args, kwargs)
+        
+        match shard_periods:
+            case True:
+                years_per_shard = self._years_per_shard(params, start, end)
+            case False | None:
+                years_per_shard = None
+            case int():
+                assert shard_periods > 0, "The periods' shards must have at least one year."
+                years_per_shard = shard_periods
+            case _:
+                raise AssertionError(f"Periods' sharding {shard_periods!r} not available. Use a boolean, or a number of years.")
+        
+        # Build urls, splitting the arguments so each fits the maximum url size (max is 323...)
+        return URLFactory.compact_data_split(self.id, params.values(), start, end, max_size=MAX_URL_SIZE, years_per_shard=years_per_shard)
+    
+    def _estimate_observations(self, params: OrderedDict[str, list[str]], start: str = '1900', end: str = '2100') -> int:
+        """Estimate (an upper bound of) the observations requested - for every combination of the arguments to parameters 
+        (or of all their values, where none are given), an observation per period of their frequency."""
+        years = self._years_requested(start, end)
         
-        # Assert size of url is not too large (max is 323...)
-        assert len(url) <= MAX_URL_SIZE, f"Requesting url is too large: length ({len(url)}) > max ({MAX_URL_SIZE}), for {url!r}. Choose fewer parameters."
+        series = 1
+        for param, args in params.items():
+            if param != 'FREQ':
+                series *= len(args) if any(args) else len(self.values_of(param))
+        
+        # (the frequency of the series is unknown without the parameter, so the highest common one is assumed)
+        frequencies = (params['FREQ'] if any(params['FREQ']) else self.values_of('FREQ')) if 'FREQ' in params else ['M']
+        
+        return series * years * sum(OBSERVATIONS_PER_YEAR.get(freq, 12) for freq in frequencies)
+    
+    def _years_per_shard(self, params: OrderedDict[str, list[str]], start: str = '1900', end: str = '2100') -> int | None:
+        """Choose the years of the periods' shards for the estimated observations to fit the maximum per request - in
+        whole decades, or else in shards of 5, 2 or single years (None if no sharding is needed)."""
+        if (observations := self._estimate_observations(params, start, end)) <= MAX_OBSERVATIONS_PER_REQUEST:
+            return None
+        
+        years = self._years_requested(start, end) * MAX_OBSERVATIONS_PER_REQUEST // observations
+        return years // 10 * 10 if years >= 10 else next(size for size in (5, 2, 1) if size <= max(years, 1))
+    
+    @staticmethod
+    def _years_requested(start: str, end: str) -> int:
+        """The years from `start` to `end` - up to the current one, as there are (next to) no observations after it."""
+        return max(min(int(end[:4]), date.today().year) - int(start[:4]) + 1, 1)
+    
+    def _stitch_series(self, json_data: list[dict]) -> list[dict]:
+        """Stitch the series split across responses (of consecutive periods) into continuous ones, with their observations
+        in the responses' order - as the json data of a single response."""
+        items, obs = {}, {}
+        for data in json_data:
+            for item in self._columnar_parser.series(data):
+                key = tuple(item.get('@' + param) for param in self.parameters)
+                items.setdefault(key, item)
+                obs.setdefault(key, []).extend(self._columnar_parser.obs(item))
+        
+        # (the responses' items are copied, as they may be shared, e.g. by the response cache)
+        return [{'CompactData': {'DataSet': {'Series': [{**item, 'Obs': obs[key]} for key, item in items.items()]}}}]
+    
+    def _to_dataframes(self, json_data: list[dict], engine: str | None = None, output: str = 'series', periods: str | None = None) -> list[DataFrame] | DataFrame:
+        """Parse (and assert consistency of) the responses' json data, merging their series into dataframes."""
+        assert output in OUTPUTS, f"Output {output!r} not available. Use one of the following: {OUTPUTS}."
+        assert periods is None or periods in PERIODS, f"Periods {periods!r} not available. Use one of the following: {PERIODS}."
+        assert periods is None or output == 'series', "Periods can only index the series' dataframes (of `output='series'`)."
         
-        # Get data and assert consistency
-        json_data = url.get_json(self._client)
-        parsed_data = self.CompactDataResponse.from_raw(json_data)
+        if output == 'long':
+            # Validate with the data model, if required, but build the dataframe directly from the json data
+            if (engine or self.engine) == 'pydantic':
+                with instruments.span('validation', dataset=self.id):
+                    for data in json_data:
+                        self.CompactDataResponse.from_raw(data)
+            elif (engine or self.engine) not in ENGINES:
+                raise WrapperException(f"Engine {engine!r} not available. Use one of the following: {ENGINES}.")
+            
+            with instruments.span('dataframe', dataset=self.id):
+                return self._columnar_parser.to_long_dataframe(item for data in json_data for item in self._columnar_parser.series(data))
         
-        return [series.to_dataframe() for series in parsed_data.series]   
+        match engine or self.engine:
+            case 'pydantic':
+                with instruments.span('validation', dataset=self.id):
+                    parsed_data = [self.CompactDataResponse.from_raw(data) for data in json_data]
+                with instruments.span('dataframe', dataset=self.id):
+                    return [series.to_dataframe(periods) for data in parsed_data for series in data.series]
+            case 'columnar':
+                # (the columnar parser validates the series' attributes while building the dataframes)
+                with instruments.span('dataframe', dataset=self.id):
+                    return [dataframe for data in json_data for dataframe in self._columnar_parser.iter_dataframes(data, periods)]
+            case _ as engine:
+                raise WrapperException(f"Engine {engine!r} not available. Use one of the following: {ENGINES}.")
     
     @staticmethod
     def _build_parameters_string(params_args: list[str, list[str]]) -> str:
@@ -8,4 +8,9 @@ class LimitExceeded(ServerException):
     pass
 
 class UnknownServerException(ServerException):
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+class CircuitOpen(ServerException):
     pass
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""Module with the bulk extractor of whole datasets into (partitioned) parquet files.
+
+A dataset is mirrored by enumerating the codes of one of its parameters (by default, the one with the most codes), and
+planning shards of them that fit the maximum url size - each requesting all values of the other parameters. Shards are
+downloaded concurrently (within the limit of requests), and each is written as soon as it arrives, and checkpointed on a
+manifest - so an interrupted extraction resumes where it stopped, instead of starting over.
+
+Requires the (optional) `pyarrow` package.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from hashlib import sha1
+from pathlib import Path
+from threading import Lock
+
+from globals import MAX_URL_SIZE
+from exceptions import WrapperException
+from client import IMFClient
+from dataset import Dataset
+from url import URLFactory
+
+import logging
+log = logging.getLogger(__name__)
+
+
+class DatasetExtractor:
+    """Extracts all the data of a dataset into `directory/<dataset>/`, partitioned by the `partition_by` parameter."""
+
+    MANIFEST = '_manifest.json'
+
+    def __init__(self,
+                 dataset: Dataset,
+                 directory: str | Path,
+                 partition_by: str | None = None,
+                 max_values_per_shard: int | None = None,
+                 start: str = '1900',
+                 end: str = '2100'):
+
+        self.dataset = dataset
+        self.directory = Path(directory).expanduser() / dataset.id
+        self.partition_by = partition_by or max(dataset.parameters, key=lambda param: len(dataset.values_of(param)))
+        self.max_values_per_shard = max_values_per_shard
+        self.start, self.end = start, end
+
+        assert self.partition_by in dataset.parameters, \
+            f"Parameter {self.partition_by!r} not available for this dataset. Use one of the following: {dataset.parameters}."
+
+        self._manifest_path = self.directory / self.MANIFEST
+        self._lock = Lock()
+
+    def plan(self) -> list[str]:
+        """Plan the shards' urls - chunks of the partition parameter's codes (with all values of the other parameters)."""
+        codes = self.dataset.values_of(self.partition_by)
+        size = self.max_values_per_shard or len(codes)
+
+        urls = []
+        for k in range(0, len(codes), size):
+            params_args = [codes[k:k+size] if param == self.partition_by else '' for param in self.dataset.parameters]
+            urls.extend(URLFactory.compact_data_split(self.dataset.id, params_args, self.start, self.end, max_size=MAX_URL_SIZE))
+
+        return urls
+
+    def _load_manifest(self) -> dict:
+        try:
+            with open(self._manifest_path) as file:
+                manifest = json.load(file)
+        except FileNotFoundError:
+            return {'dataset': self.dataset.id, 'partition_by': self.partition_by, 'shards': {}}
+
+        if manifest.get('partition_by') != self.partition_by:
+            raise WrapperException(f"Extraction in {str(self.directory)!r} was partitioned by {manifest.get('partition_by')!r}, "
+                                   f"not {self.partition_by!r} - choose another directory.")
+        return manifest
+
+    def _save_manifest(self, manifest: dict) -> None:
+        """Save the manifest (atomically, so an interruption never leaves it partially written)."""
+        temp_path = self._manifest_path.with_suffix('.tmp')
+
+        with open(temp_path, 'w') as file:
+            json.dump(manifest, file, indent=1)
+        os.replace(temp_path, self._manifest_path)
+
+    @staticmethod
+    def _shard_id(url: str) -> str:
+        return sha1(url.encode()).hexdigest()[:16]
+
+    def _extract_shard(self, client: IMFClient, url: str) -> int:
+        """Request, parse and write a shard, returning its number of rows."""
+        dataframe = self.dataset._to_dataframes([client.get_json(url)], engine='columnar', output='long')
+
+        if len(dataframe):
+            dataframe.to_parquet(self.directory,
+                                 partition_cols=[self.partition_by],
+                                 basename_template=f"shard-{self._shard_id(url)}-{{i}}.parquet",
+                                 existing_data_behavior='overwrite_or_ignore',
+                                 index=False)
+        return len(dataframe)
+
+    def run(self, max_workers: int | None = None) -> dict:
+        """Extract the shards not extracted yet, returning the (updated) manifest.
+        Failed shards are recorded as such (and retried on the next run)."""
+        try:
+            import pyarrow
+        except ImportError:
+            raise WrapperException("Extracting to parquet requires the `pyarrow` package (`pip install pyarrow`).") from None
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        manifest = self._load_manifest()
+
+        pending = [url for url in self.plan() if manifest['shards'].get(self._shard_id(url), {}).get('status') != 'done']
+        log.info(f"Extracting {len(pending)} shards of {self.dataset.id!r} ({len(manifest['shards'])} in manifest).")
+
+        client = self.dataset._client or IMFClient(rate_limiter=self.dataset._rate_limiter)
+
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers or client.max_concurrency) as executor:
+                futures = {executor.submit(self._extract_shard, client, url): url for url in pending}
+
+                for done, future in enumerate(as_completed(futures), start=1):
+                    url = futures[future]
+
+                    try:
+                        shard = {'url': url, 'status': 'done', 'rows': future.result()}
+                    except Exception as exc:
+                        log.error(f"Shard {url!r} failed: {exc!r}")
+                        shard = {'url': url, 'status': 'failed', 'error': repr(exc)}
+
+                    with self._lock:
+                        manifest['shards'][self._shard_id(url)] = shard
+                        self._save_manifest(manifest)
+
+                    log.debug(f"Extracted {done}/{len(pending)} shards.")
+        finally:
+            if client is not self.dataset._client:
+                client.close()
+
+        return manifest
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.dataset.id!r}, {str(self.directory)!r}, partition_by={self.partition_by!r})"
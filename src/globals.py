@@ -1,8 +1,7 @@
-from collections import deque
+from os import environ
+from pathlib import Path
 
-global_last_requests = deque(maxlen=10)
-
-BASE_URL = "http://dataservices.imf.org/REST/SDMX_JSON.svc"
+BASE_URL = environ.get('IMF_BASE_URL', "http://dataservices.imf.org/REST/SDMX_JSON.svc")  # (overridable, e.g. for a local stand-in)
 
 BASE_HEADERS = {
     'Accept': 'application/json',
@@ -13,3 +12,41 @@ BASE_HEADERS = {
 }
 
 MAX_URL_SIZE = 323
+
+MAX_CONCURRENT_REQUESTS = 10
+
+REQUESTS_TIMEOUT = 30.0  # seconds
+
+REQUESTS_RATE = 2.0  # requests per second (the API allows about 10 requests every 5 seconds)
+
+REQUESTS_BURST = 10
+
+RETRY_ATTEMPTS = 3  # (on transient failures - timeouts, connection errors, limits exceeded and server errors)
+
+RETRY_BACKOFF = 0.5  # seconds, doubled on every attempt (with jitter), up to the maximum
+
+RETRY_MAX_BACKOFF = 10.0
+
+ENGINES = ('pydantic', 'columnar')  # for parsing `/CompactData` responses
+
+DEFAULT_ENGINE = 'pydantic'
+
+MAX_OBSERVATIONS_PER_REQUEST = 50_000  # (estimated) above which requests sharding their periods are split into shards of years
+
+OBSERVATIONS_PER_YEAR = {'A': 1, 'B': 2, 'Q': 4, 'M': 12, 'W': 52, 'D': 365}  # by frequency (the `FREQ` parameter's codes)
+
+OUTPUTS = ('series', 'long')  # a dataframe per series, or a single one with a row per observation
+
+PERIODS = ('period', 'timestamp')  # indexes of the series' dataframes - a `PeriodIndex`, or a `DatetimeIndex` of their starts
+
+CACHE_DIR = Path(environ.get('IMF_CACHE_DIR', Path.home() / '.cache' / 'imf-api-wrapper'))
+
+STRUCTURE_CACHE_TTL = 30 * 24 * 60 * 60  # seconds (structures change about monthly)
+
+STRUCTURE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+CATALOG_CACHE_TTL = 24 * 60 * 60  # seconds (after which the list of datasets is revalidated)
+
+RESPONSE_CACHE_TTL = 60.0  # seconds (responses kept in memory, to serve identical requests)
+
+RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
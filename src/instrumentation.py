@@ -0,0 +1,135 @@
+"""Module with the instrumentation of the wrapper - timing spans of its phases, and counters of its events.
+
+Spans time the phases of getting datasets and data:
+* `rate_limit_wait` - waiting for the rate limiter, before each request
+* `request` - the request itself (until its body is read)
+* `json_decode` - decoding the responses' bodies
+* `structure_parse` and `dataset_construction` - parsing a dataset's structure, and creating the dataset
+* `validation` and `dataframe` - validating the data (with the pydantic engine), and building the dataframes
+* `get_dataset`, `get_data` and `get_batch` - the whole calls, enclosing the above
+
+Counters count `requests`, response `bytes`, `limit_exceeded` responses, `retries`, `hedged_requests`, and `cache_hits` /
+`cache_misses` (by cache).
+
+Both are reported to the hooks registered on the (global) `instruments` - e.g. the in-memory `Metrics`, logging, or an
+adapter to a metrics exporter or a tracer. With no hooks registered, instrumentation costs next to nothing.
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+from threading import Lock
+from time import perf_counter
+from typing import Iterator
+
+from globals import BASE_URL
+
+import logging
+log = logging.getLogger(__name__)
+
+
+class Hook:
+    """Receives the spans and counters of the instrumentation - to be subclassed, overriding either (or both) methods."""
+
+    def on_span(self, name: str, duration: float, attrs: dict[str, str]) -> None:
+        """Called with the duration (in seconds) of each span, once it ends (even if it failed)."""
+
+    def on_count(self, name: str, value: int, attrs: dict[str, str]) -> None:
+        """Called with the increment of a counter."""
+
+
+class LoggingHook(Hook):
+    """Logs every span and counter, at the given level."""
+
+    def __init__(self, level: int = logging.DEBUG):
+        self.level = level
+
+    def on_span(self, name, duration, attrs):
+        log.log(self.level, f"{name} took {duration * 1000:.2f} ms {attrs}")
+
+    def on_count(self, name, value, attrs):
+        log.log(self.level, f"{name} +{value} {attrs}")
+
+
+class Metrics(Hook):
+    """Aggregates the spans (their count and total duration) and counters in memory, by name and attributes."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.spans: dict[tuple, list[float]] = defaultdict(lambda: [0, 0.0])
+            self.counters: dict[tuple, int] = defaultdict(int)
+
+    @staticmethod
+    def _key(name: str, attrs: dict[str, str]) -> tuple:
+        return (name, *sorted(attrs.items()))
+
+    def on_span(self, name, duration, attrs):
+        with self._lock:
+            span = self.spans[self._key(name, attrs)]
+            span[0] += 1
+            span[1] += duration
+
+    def on_count(self, name, value, attrs):
+        with self._lock:
+            self.counters[self._key(name, attrs)] += value
+
+    def snapshot(self) -> dict[str, dict]:
+        """Get the spans (as their count and total seconds) and counters, by name (summed over their attributes)."""
+        spans, counters = defaultdict(lambda: {'count': 0, 'seconds': 0.0}), defaultdict(int)
+
+        with self._lock:
+            for (name, *_), (count, seconds) in self.spans.items():
+                spans[name]['count'] += count
+                spans[name]['seconds'] += seconds
+            for (name, *_), value in self.counters.items():
+                counters[name] += value
+
+        return {'spans': dict(spans), 'counters': dict(counters)}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.snapshot()})"
+
+
+class Instruments:
+    """Registry of hooks, reporting the spans and counters to all of them."""
+
+    def __init__(self):
+        self.hooks: list[Hook] = []
+
+    def add(self, hook: Hook) -> Hook:
+        self.hooks.append(hook)
+        return hook
+
+    def remove(self, hook: Hook) -> None:
+        self.hooks.remove(hook)
+
+    @contextmanager
+    def span(self, name: str, **attrs: str) -> Iterator[None]:
+        """Time the enclosed block, as a span with the given name and attributes."""
+        if not self.hooks:
+            yield
+            return
+
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            duration = perf_counter() - start
+            for hook in self.hooks:
+                hook.on_span(name, duration, attrs)
+
+    def count(self, name: str, value: int = 1, **attrs: str) -> None:
+        for hook in self.hooks:
+            hook.on_count(name, value, attrs)
+
+
+def endpoint(url: str) -> str:
+    """Get the endpoint of an url of the IMF's API (e.g. 'CompactData'), to label its requests by."""
+    return url.removeprefix(BASE_URL).strip('/').split('/', 1)[0]
+
+
+# Instruments used by the wrapper (and its clients, caches and datasets)
+instruments = Instruments()
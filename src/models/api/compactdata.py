@@ -1,9 +1,11 @@
 from typing import Generic, Type, TypeVar
-from pydantic import BaseModel, Field, create_model
+from pydantic import BaseModel, Field, create_model, validator
 from pydantic.generics import GenericModel
+import numpy as np
 from pandas import DataFrame
 
 from exceptions import WrapperException
+from periods import period_index
 
 class ObservationItem(BaseModel):
     
@@ -27,8 +29,22 @@ class SeriesItem(BaseModel):
                             obs=(list[ObservationItemDynamic], Field(alias='Obs', default_factory=lambda: [])),
                             **{name: (type_, Field(None, alias='@' + name)) for name, type_ in series_attrs.items()})
     
-    def to_dataframe(self):
-        dataframe = DataFrame.from_dict(obs.dict() for obs in self.obs)
+    # Processing
+    @validator('obs', pre=True)
+    def process_obs(cls, v: list | object):
+        return v if isinstance(v, list) else [v]
+    
+    def to_dataframe(self, periods: str | None = None):
+        # Build a column per observation attribute, with the numeric ones straight into `float64` arrays
+        columns = {}
+        for name, field in self.__fields__['obs'].type_.__fields__.items():
+            values = [obs.__dict__[name] for obs in self.obs]
+            columns[name] = np.array(values, dtype=np.float64) if field.type_ is float else values
+        
+        # Index by the periods, if required (see `periods.period_index`)
+        index = period_index(columns.pop('TIME_PERIOD'), self.__dict__.get('FREQ'), periods) if periods is not None else None
+        
+        dataframe = DataFrame(columns, index=index)
         dataframe.attrs.update((name, value) for name, value in self.__dict__.items() if name != 'obs')
         return dataframe
     
@@ -46,7 +62,7 @@ class CompactDataResponse(GenericModel, Generic[SeriesItemGeneric]):
     def from_raw(cls, json: dict):
         match json:
             case {"CompactData": {"DataSet": {"Series": series}}}:
-                return cls(series=series)
+                return cls(series=series if isinstance(series, list) else [series])
             case {"CompactData": {"DataSet": _}}:
                 return cls(series=[])
             case _:
@@ -1,16 +1,24 @@
-from typing import Optional, Literal
+from typing import Optional
 from pydantic import BaseModel
 
+from codelists import Codelist, codelists
+
 class Attribute(BaseModel):
     """This could be a parameter or a series attribute."""
     name: str
     desc: str
-    values: dict[str, str] | str
+    values: Codelist | str  # (codelists are shared by all attributes with the same codes)
+    
+    def __setstate__(self, state):
+        # Codelists pickled as plain dicts (by structures cached before codelists were shared) are interned too
+        super().__setstate__(state)
+        if isinstance(self.values, dict):
+            object.__setattr__(self, 'values', codelists.intern(self.values))
     
     def as_type(self):
         match self.values:
-            case v if isinstance(v, dict):
-                return Literal[tuple(v.keys())]
+            case Codelist() as codelist:
+                return codelist.literal
             case 'Double':
                 return Optional[float]
             case 'DateTime':
@@ -0,0 +1,70 @@
+"""Module with the vectorized conversion of series' periods (the `TIME_PERIOD` strings) into pandas indexes.
+
+The IMF's API formats periods by frequency - '2020' (annual), '2020-B1' (semiannual), '2020-Q1' (quarterly), '2020-03'
+(monthly) and '2020-03-15' (weekly and daily). Rather than parsing each string, a series' periods are viewed as a matrix of
+bytes, from whose digits the periods' ordinals are computed in a single pass - and then built into a `PeriodIndex` (or
+the `DatetimeIndex` of the periods' starts), with which the parsers build the series' dataframes.
+"""
+
+import numpy as np
+from pandas import DatetimeIndex, PeriodIndex, to_datetime
+
+from exceptions import WrapperException
+
+# Layout of the periods of each frequency (the `FREQ` parameter's codes): their length, the position and width of the
+# period within the year, and the ordinals of a year and of a period within it - in the pandas frequency to build them as
+PERIOD_FORMATS = {
+    'A': (4, None, 0, 1, 0, 'Y'),
+    'B': (7, 6, 1, 12, 6, '6M'),
+    'Q': (7, 6, 1, 4, 1, 'Q'),
+    'M': (7, 5, 2, 12, 1, 'M'),
+}
+DATE_FREQUENCIES = {'W': 'W', 'D': 'D'}  # (formatted as dates)
+
+
+def infer_frequency(period: str) -> str:
+    """Infer the frequency of a period from its format (for datasets without a `FREQ` parameter)."""
+    match len(period), period[5:6]:
+        case 4, _:
+            return 'A'
+        case 7, 'B' | 'Q' as frequency:
+            return frequency
+        case 7, _:
+            return 'M'
+        case _:
+            return 'D'
+
+
+def period_ordinals(periods: np.ndarray | list[str], frequency: str) -> np.ndarray:
+    """Compute the ordinals (periods since 1970) of periods of one of the `PERIOD_FORMATS`' frequencies."""
+    size, position, width, year_step, period_step, _ = PERIOD_FORMATS[frequency]
+
+    periods = np.asarray(periods, dtype='S16')
+    digits = periods.astype(f"S{size}").view(np.uint8).reshape(-1, size).astype(np.int64) - ord('0')
+
+    year = digits[:, :4]
+    period = digits[:, position:position + width] if position is not None else np.zeros((len(periods), 0), dtype=np.int64)
+    valid = (np.char.str_len(periods) == size) & ((0 <= year) & (year <= 9)).all(axis=1) & ((0 <= period) & (period <= 9)).all(axis=1)
+    if not valid.all():
+        raise WrapperException(f"Period {periods[~valid][0].decode()!r} is not of frequency {frequency!r}.")
+
+    ordinals = (year @ np.array([1000, 100, 10, 1]) - 1970) * year_step
+    if position is not None:
+        ordinals += (period @ 10 ** np.arange(width - 1, -1, -1) - 1) * period_step
+
+    return ordinals
+
+
+def period_index(periods: np.ndarray | list[str], frequency: str | None = None, kind: str = 'period') -> PeriodIndex | DatetimeIndex:
+    """Build the index of a series' periods, of the given frequency (or inferred from their format, if None) - as a 
+    `PeriodIndex` (`kind='period'`), or as the `DatetimeIndex` of the periods' starts (`kind='timestamp'`)."""
+    frequency = frequency or (infer_frequency(periods[0]) if len(periods) else 'A')
+
+    if frequency in PERIOD_FORMATS:
+        index = PeriodIndex.from_ordinals(period_ordinals(periods, frequency), freq=PERIOD_FORMATS[frequency][-1])
+    elif frequency in DATE_FREQUENCIES:
+        index = to_datetime(periods, format='%Y-%m-%d').to_period(DATE_FREQUENCIES[frequency])
+    else:
+        raise WrapperException(f"Frequency {frequency!r} not available. Use one of the following: {(*PERIOD_FORMATS, *DATE_FREQUENCIES)}.")
+
+    return (DatetimeIndex(index.to_timestamp()) if kind == 'timestamp' else index).rename('TIME_PERIOD')
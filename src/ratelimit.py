@@ -0,0 +1,91 @@
+"""Module with the rate limiter shared by all requests to the IMF's API.
+
+The API limits the number of requests per time (answering with a `302` when exceeded), so every request path - sync or
+async, in any thread - takes a token from the same bucket before being made.
+"""
+
+import asyncio
+from threading import Lock
+from time import monotonic, sleep
+
+from globals import REQUESTS_RATE, REQUESTS_BURST
+
+import logging
+log = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """A token bucket, refilled at `rate` tokens per second up to `burst` tokens.
+
+    Tokens are reserved under a lock (so it is thread-safe) and the waiting is done outside it - sleeping for sync
+    callers and awaiting for async ones. When the API signals the limit was exceeded, the rate is reduced by
+    `backoff` (and the bucket emptied), then recovered additively on each successful response.
+    """
+
+    def __init__(self,
+                 rate: float = REQUESTS_RATE,
+                 burst: int = REQUESTS_BURST,
+                 backoff: float = 2.0,
+                 min_rate: float | None = None):
+
+        assert rate > 0 and burst >= 1, "The rate must be positive and the burst at least 1."
+
+        self.rate = rate
+        self.burst = burst
+        self.backoff = backoff
+        self.min_rate = min_rate or rate / 16
+
+        self._current_rate = rate
+        self._tokens = float(burst)
+        self._updated = monotonic()
+        self._lock = Lock()
+
+    @property
+    def current_rate(self) -> float:
+        """The rate currently in use (lower than `rate` while backing off)."""
+        return self._current_rate
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self._current_rate)
+        self._updated = now
+
+    def _reserve(self) -> float:
+        """Take a token (possibly in advance), returning how long to wait until it is available."""
+        with self._lock:
+            now = monotonic()
+            self._refill(now)
+            self._tokens -= 1
+
+            return 0. if self._tokens >= 0 else -self._tokens / self._current_rate
+
+    def acquire(self) -> None:
+        """Wait (blocking) until a request is allowed."""
+        if (delay := self._reserve()) > 0:
+            sleep(delay)
+
+    async def aacquire(self) -> None:
+        """Wait (asynchronously) until a request is allowed."""
+        if (delay := self._reserve()) > 0:
+            await asyncio.sleep(delay)
+
+    def penalize(self) -> None:
+        """Back off after the API signalled the limit was exceeded."""
+        with self._lock:
+            self._refill(monotonic())
+            self._current_rate = max(self.min_rate, self._current_rate / self.backoff)
+            self._tokens = min(self._tokens, 0.)
+
+        log.warning(f"Requests limit exceeded - backing off to {self._current_rate:.2f} requests per second.")
+
+    def recover(self) -> None:
+        """Increase the rate back (towards `rate`) after a successful request."""
+        if self._current_rate < self.rate:
+            with self._lock:
+                self._refill(monotonic())
+                self._current_rate = min(self.rate, self._current_rate + self.rate / (4 * self.burst))
+
+    def __repr__(self):
+        return f"{type(self).__name__}(rate={self.rate}, burst={self.burst})"
+
+
+global_rate_limiter = TokenBucket()
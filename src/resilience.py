@@ -0,0 +1,111 @@
+"""Module with the policies that make requests to the IMF's API resilient to its failures.
+
+* Transient failures (timeouts, connection errors, limits exceeded and server errors) are retried, with exponential
+  back-off and jitter - each attempt still taking a token from the rate limiter, so retries do not exceed the limit.
+* A circuit breaker, after repeated transient failures, fails requests at once (for a while), rather than letting them
+  wait on a service that is down - then lets a single request through, to check if it recovered.
+(Hedged requests, against the API's long latency tail, are made by the clients themselves.)
+"""
+
+from random import uniform
+from threading import Lock
+from time import monotonic
+from typing import Iterator
+from httpx import TransportError
+
+from globals import RETRY_ATTEMPTS, RETRY_BACKOFF, RETRY_MAX_BACKOFF
+from exceptions import CircuitOpen, LimitExceeded, UnknownServerException
+
+import logging
+log = logging.getLogger(__name__)
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Check if a request's failure is transient (so the request may succeed if retried)."""
+    match exc:
+        case TransportError() | LimitExceeded():
+            return True
+        case UnknownServerException(status_code=status_code):
+            # (no status code means an invalid response, e.g. an html error page)
+            return status_code is None or status_code == 429 or status_code >= 500
+        case _:
+            return False
+
+
+class RetryPolicy:
+    """Retries of transient failures - up to `attempts` in total, waiting a random time up to `backoff` seconds before
+    the second attempt, doubling on each further one (up to `max_backoff`)."""
+
+    def __init__(self,
+                 attempts: int = RETRY_ATTEMPTS,
+                 backoff: float = RETRY_BACKOFF,
+                 max_backoff: float = RETRY_MAX_BACKOFF):
+
+        assert attempts >= 1, "There must be at least one attempt."
+
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def delays(self) -> Iterator[float]:
+        """The waits before each retry (so one less than the attempts) - with "full jitter", so that requests failed
+        together are not retried together."""
+        for attempt in range(self.attempts - 1):
+            yield uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def __repr__(self):
+        return f"{type(self).__name__}(attempts={self.attempts}, backoff={self.backoff}, max_backoff={self.max_backoff})"
+
+
+class CircuitBreaker:
+    """Fails requests at once (with `CircuitOpen`) for `reset_timeout` seconds after `failure_threshold` consecutive
+    transient failures. Then a single request is let through - closing the circuit if it succeeds, or opening it again.
+    It is thread-safe, and may be shared by several clients."""
+
+    def __init__(self,
+                 failure_threshold: int = 5,
+                 reset_timeout: float = 30.0):
+
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_started: float | None = None
+        self._lock = Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return 'closed'
+        return 'half-open' if monotonic() - self._opened_at >= self.reset_timeout else 'open'
+
+    def before_request(self) -> None:
+        """Check that a request may be made, raising `CircuitOpen` otherwise."""
+        with self._lock:
+            match self.state:
+                case 'open':
+                    remaining = self.reset_timeout - (monotonic() - self._opened_at)
+                    raise CircuitOpen(f"The IMF API is failing - requests are suspended for {remaining:.1f} more seconds.")
+                # (a trial whose outcome was never recorded, e.g. if cancelled, is given up on after the timeout too)
+                case 'half-open' if self._trial_started is not None and monotonic() - self._trial_started < self.reset_timeout:
+                    raise CircuitOpen("The IMF API is failing - waiting for a request to check if it recovered.")
+                case 'half-open':
+                    self._trial_started = monotonic()
+
+    def record(self, exc: BaseException | None) -> None:
+        """Record the outcome of a request - a success, or a failure (only transient failures count towards opening)."""
+        with self._lock:
+            self._trial_started = None
+
+            if exc is None or not is_transient(exc):
+                self._failures, self._opened_at = 0, None
+                return
+
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                log.warning(f"Opening the circuit, after {self._failures} consecutive failures (last: {exc!r}).")
+                self._opened_at = monotonic()
+
+    def __repr__(self):
+        return f"{type(self).__name__}(state={self.state!r}, failures={self._failures})"
@@ -0,0 +1,165 @@
+"""Module with a search index over the codelists (and concepts) of several datasets.
+
+Finding which dataset and component holds a code (e.g. a country, or an indicator) would otherwise require going through
+the structure of every dataset. The index is built once from the datasets' structures (cached, or requested concurrently),
+can be persisted, and is then queried in memory - by exact code, or by (prefixes of) the words in the descriptions.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass
+from re import findall
+from typing import TYPE_CHECKING, Iterable
+
+from cache import DiskCache
+
+if TYPE_CHECKING:
+    from models.dataset import Attribute
+    from wrapper import IMFWrapper
+
+import logging
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CodeMatch:
+    """A code of a dataset's component (or the component itself, if `code` is None), with its description."""
+    dataset: str
+    component: str
+    code: str | None
+    desc: str
+
+
+class CodelistIndex:
+    """Index of the codes of the datasets' parameters and series attributes, and of the components' descriptions."""
+
+    CACHE_KEY = 'codelist-index'
+
+    def __init__(self):
+        self.datasets: set[str] = set()
+        self._entries: list[CodeMatch] = []
+
+        # Entries by (upper case) code, and by the (lower case) words in their codes and descriptions
+        self._codes: dict[str, list[int]] = {}
+        self._tokens: dict[str, set[int]] = {}
+
+        # Sorted words, for prefix searches (rebuilt on first search after adding datasets)
+        self._sorted_tokens: list[str] | None = None
+
+    @staticmethod
+    def _tokenize(text: str) -> list[str]:
+        return findall(r"\w+", text.lower())
+
+    def _add_entry(self, entry: CodeMatch) -> None:
+        index = len(self._entries)
+        self._entries.append(entry)
+
+        if entry.code is not None:
+            self._codes.setdefault(entry.code.upper(), []).append(index)
+
+        for token in self._tokenize(f"{entry.code or entry.component} {entry.desc}"):
+            self._tokens.setdefault(token, set()).add(index)
+
+    def add(self,
+            dataset_id: str,
+            parameters: list[Attribute],
+            observation_attrs: list[Attribute],
+            series_attrs: list[Attribute],
+            annotations: dict[str, str] | None = None) -> None:
+        """Add a dataset's structure (as given by the wrapper's `get_structures`) to the index, replacing it if already indexed."""
+        if dataset_id in self.datasets:
+            self.remove(dataset_id)
+
+        for attr in [*parameters, *series_attrs, *observation_attrs]:
+            self._add_entry(CodeMatch(dataset_id, attr.name, None, attr.desc))
+
+            if isinstance(attr.values, dict):
+                for code, desc in attr.values.items():
+                    self._add_entry(CodeMatch(dataset_id, attr.name, code, desc))
+
+        self.datasets.add(dataset_id)
+        self._sorted_tokens = None
+
+    def remove(self, dataset_id: str) -> None:
+        """Remove a dataset from the index (rebuilding it from the remaining entries)."""
+        entries = [entry for entry in self._entries if entry.dataset != dataset_id]
+
+        self._entries, self._codes, self._tokens, self._sorted_tokens = [], {}, {}, None
+        for entry in entries:
+            self._add_entry(entry)
+        self.datasets.discard(dataset_id)
+
+    def lookup(self, code: str) -> list[CodeMatch]:
+        """Get the datasets' components that have the given code (case insensitive)."""
+        return [self._entries[i] for i in self._codes.get(code.upper(), [])]
+
+    def _prefixed(self, prefix: str) -> set[int]:
+        """Get the entries with a word starting with the given prefix."""
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self._tokens)
+
+        indices = set()
+        for k in range(bisect_left(self._sorted_tokens, prefix), len(self._sorted_tokens)):
+            token = self._sorted_tokens[k]
+            if not token.startswith(prefix):
+                break
+            indices |= self._tokens[token]
+
+        return indices
+
+    def search(self,
+               query: str,
+               dataset: str | None = None,
+               component: str | None = None,
+               limit: int | None = None) -> list[CodeMatch]:
+        """Get the entries whose code or description has words starting with every word in the query (e.g. 'gross dom prod'),
+        optionally only of a `dataset` and/or `component`."""
+        tokens = self._tokenize(query)
+        if not tokens:
+            return []
+
+        # Intersect the matches of each word, starting from the rarest
+        matches = sorted((self._prefixed(token) for token in tokens), key=len)
+        indices = set.intersection(*matches)
+
+        results = []
+        for i in sorted(indices):
+            entry = self._entries[i]
+
+            if (dataset is None or entry.dataset == dataset) and (component is None or entry.component == component):
+                results.append(entry)
+                if limit is not None and len(results) >= limit:
+                    break
+
+        return results
+
+    @classmethod
+    def build(cls,
+              imf: IMFWrapper,
+              dataset_ids: Iterable[str] | None = None,
+              cache: DiskCache | None = None) -> CodelistIndex:
+        """Build the index for the given datasets (by default, the ones listed by the wrapper's `datasets`), from their
+        structures. If a `cache` is given, the index is read from it, and only the datasets it is missing are added (and it
+        is then stored again)."""
+        dataset_ids = list(dataset_ids) if dataset_ids is not None else list(imf.datasets)
+
+        index = cache.get(cls.CACHE_KEY) if cache is not None else None
+        index = index if index is not None else cls()
+
+        if missing := [dataset_id for dataset_id in dataset_ids if dataset_id not in index.datasets]:
+            log.info(f"Indexing the codelists of {len(missing)} datasets.")
+
+            for dataset_id, structure in imf.get_structures(missing).items():
+                index.add(dataset_id, *structure)
+
+            if cache is not None:
+                cache.set(cls.CACHE_KEY, index)
+
+        return index
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"{type(self).__name__}(datasets={len(self.datasets)}, entries={len(self)})"
@@ -0,0 +1,253 @@
+"""Module with local stores of series' data.
+
+* `SeriesStore` keeps each dataset's series by their key - the values of their parameters joined by '.' (e.g. 
+  'A.US.NGDP_XDC'), as in the IMF's API urls - so that a refresh only needs to request the periods after the last ones stored.
+* `ParquetStore` keeps each dataset's observations (in long format) in parquet files, partitioned by one of its parameters
+  (as written by the `DatasetExtractor`), to be queried offline - reading only the partitions and row groups matching the
+  query, from memory-mapped files. Requires the (optional) `pyarrow` package.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING
+from pandas import Categorical, DataFrame, concat
+
+from globals import CACHE_DIR
+from cache import DiskCache
+from exceptions import WrapperException
+
+if TYPE_CHECKING:
+    from dataset import Dataset
+
+
+@dataclass(frozen=True)
+class RefreshReport:
+    """What changed in the stored series of a dataset, after refreshing them from `start`."""
+    dataset: str
+    start: str
+    new_series: list[str] = field(default_factory=list)
+    new_observations: dict[str, int] = field(default_factory=dict)
+    revised_observations: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.new_series or self.new_observations or self.revised_observations)
+
+
+class SeriesStore:
+    """A local store of series' data (as dataframes), by dataset and series key."""
+
+    def __init__(self,
+                 directory: str | Path = CACHE_DIR / 'series'):
+
+        self._cache = DiskCache(directory, ttl=None, max_bytes=None)
+
+    def series(self, dataset_id: str) -> dict[str, DataFrame]:
+        """Get the stored series of a dataset, by key."""
+        return self._cache.get(dataset_id, {})
+
+    def get(self, dataset_id: str, key: str) -> DataFrame | None:
+        return self.series(dataset_id).get(key)
+
+    def invalidate(self, dataset_id: str | None = None) -> None:
+        """Remove the stored series of a dataset (or of all datasets, if none is given)."""
+        self._cache.invalidate(dataset_id)
+
+    @staticmethod
+    def series_key(dataframe: DataFrame, parameters: tuple[str, ...]) -> str:
+        return '.'.join(dataframe.attrs.get(param) or '' for param in parameters)
+
+    def last_periods(self, dataset_id: str, params: dict[str, list[str]]) -> dict[str, str]:
+        """Get the last stored period of each (non-empty) stored series matching the arguments to parameters
+        (where no arguments match any value)."""
+        return {key: dataframe['TIME_PERIOD'].max()
+                    for key, dataframe in self.series(dataset_id).items()
+                        if len(dataframe) and all(value in args or not any(args) for value, args in zip(key.split('.'), params.values()))}
+
+    def merge(self,
+              dataset_id: str,
+              parameters: tuple[str, ...],
+              dataframes: list[DataFrame],
+              start: str) -> RefreshReport:
+        """Merge the (refreshed) series into the stored ones - new observations are added, and overlapping ones replaced."""
+        stored = self.series(dataset_id)
+        report = RefreshReport(dataset_id, start)
+
+        for dataframe in dataframes:
+            key = self.series_key(dataframe, parameters)
+
+            if (old := stored.get(key)) is None:
+                stored[key] = dataframe
+                report.new_series.append(key)
+                continue
+
+            # Count observations for new periods, and (differing) observations for stored periods
+            is_stored = dataframe['TIME_PERIOD'].isin(old['TIME_PERIOD'])
+
+            new, overlap = dataframe[~is_stored], dataframe[is_stored].set_index('TIME_PERIOD')
+            previous = old.set_index('TIME_PERIOD').loc[overlap.index, overlap.columns]
+            revised = int((~((previous == overlap) | (previous.isna() & overlap.isna()))).any(axis=1).sum())
+
+            if len(new):
+                report.new_observations[key] = len(new)
+            if revised:
+                report.revised_observations[key] = revised
+
+            if len(new) or revised:
+                merged = concat([old[~old['TIME_PERIOD'].isin(dataframe['TIME_PERIOD'])], dataframe], ignore_index=True)
+                merged = merged.sort_values('TIME_PERIOD', kind='stable', ignore_index=True)
+                merged.attrs = dict(dataframe.attrs)
+                stored[key] = merged
+
+        if report.changed:
+            self._cache.set(dataset_id, stored)
+
+        return report
+
+    def __repr__(self):
+        return f"{type(self).__name__}({str(self._cache.directory)!r})"
+
+
+class ParquetStore:
+    """A local store of datasets' observations, as parquet files under `directory/<dataset>/<parameter>=<value>/`."""
+
+    FILENAME = 'part-0.parquet'
+
+    def __init__(self,
+                 directory: str | Path = CACHE_DIR / 'parquet'):
+
+        self.directory = Path(directory).expanduser()
+
+    @staticmethod
+    def _import_pyarrow():
+        try:
+            import pyarrow
+            import pyarrow.dataset
+            import pyarrow.fs
+            import pyarrow.parquet
+        except ImportError:
+            raise WrapperException("The parquet store requires the `pyarrow` package (`pip install pyarrow`).") from None
+        return pyarrow
+
+    def partition_of(self, dataset_id: str) -> str | None:
+        """Get the parameter the stored observations of a dataset are partitioned by (None if none are stored)."""
+        path = self.directory / dataset_id
+        if not path.is_dir():
+            return None
+        return next((entry.name.split('=', 1)[0] for entry in os.scandir(path) if entry.is_dir() and '=' in entry.name), None)
+
+    def _schema(self, dataset: Dataset, exclude: str | None = None):
+        """Schema of the stored observations - the components as strings, except the numeric observation attributes."""
+        pa = self._import_pyarrow()
+        return pa.schema([(name, pa.float64() if self._is_numeric(dataset, name) else pa.string())
+                          for name in [*dataset.parameters, *dataset.series_attrs, *dataset.obs_attrs] if name != exclude])
+
+    @staticmethod
+    def _is_numeric(dataset: Dataset, name: str) -> bool:
+        return name in dataset.obs_attrs and dataset._match_attr(name).values == 'Double'
+
+    @staticmethod
+    def _to_long(dataset: Dataset, dataframes: list[DataFrame]) -> DataFrame:
+        """Build a long dataframe from dataframes of single series (with their attributes on their `attrs`)."""
+        components = [*dataset.parameters, *dataset.series_attrs]
+        return concat([dataframe.assign(**{name: dataframe.attrs.get(name) for name in components})[[*components, *dataset.obs_attrs]]
+                            for dataframe in dataframes], ignore_index=True)
+
+    def write(self,
+              dataset: Dataset,
+              data: DataFrame | list[DataFrame],
+              partition_by: str | None = None) -> int:
+        """Store the data of a dataset (as output by `get_data`, either in long format or as series), replacing the
+        stored observations of the same series and periods. Returns the number of observations written.
+
+        The observations are partitioned by the same parameter as the ones already stored, or by `partition_by` (by default,
+        the parameter with the most values)."""
+        pa = self._import_pyarrow()
+
+        dataframe = data if isinstance(data, DataFrame) else self._to_long(dataset, data)
+        if not len(dataframe):
+            return 0
+
+        partition_by = self.partition_of(dataset.id) or partition_by or max(dataset.parameters, key=lambda param: len(dataset.values_of(param)))
+        keys = [*dataset.parameters, 'TIME_PERIOD']
+
+        # Rewrite each partition written to, merged with its stored observations (the new ones replacing the stored)
+        for value, new in dataframe.groupby(partition_by, observed=True, sort=False):
+            path = self.directory / dataset.id / f"{partition_by}={value}"
+            path.mkdir(parents=True, exist_ok=True)
+            stored_files = [entry.path for entry in os.scandir(path) if entry.name.endswith('.parquet')]
+
+            schema = self._schema(dataset, exclude=partition_by)
+            new = new.drop(columns=partition_by).astype({name: object for name in schema.names if not self._is_numeric(dataset, name)})
+            if stored_files:
+                stored = pa.parquet.read_table(stored_files, schema=schema).to_pandas()
+                new = concat([stored, new], ignore_index=True).drop_duplicates([key for key in keys if key != partition_by], keep='last')
+
+            temp_path = path / f".{self.FILENAME}.tmp"  # (hidden from readers until replaced)
+            table = pa.Table.from_pandas(new.sort_values('TIME_PERIOD', kind='stable'), schema=schema, preserve_index=False)
+            pa.parquet.write_table(table, temp_path)
+            os.replace(temp_path, path / self.FILENAME)
+
+            # Remove any other files of the partition (e.g. the shards written by the extractor), now merged into this one
+            for file in stored_files:
+                if Path(file).name != self.FILENAME:
+                    os.remove(file)
+
+        return len(dataframe)
+
+    def read(self,
+             dataset: Dataset,
+             params: dict[str, list[str]],
+             start: str = '1900',
+             end: str = '2100',
+             output: str = 'series') -> DataFrame | list[DataFrame]:
+        """Read the stored observations of a dataset matching the arguments to parameters (where no arguments match any 
+        value) and within the periods from `start` to `end` - as `Dataset.get_data` would output them."""
+        pa = self._import_pyarrow()
+        path = self.directory / dataset.id
+
+        if (partition_by := self.partition_of(dataset.id)) is None:
+            return DataFrame(columns=[*dataset.parameters, *dataset.series_attrs, *dataset.obs_attrs]) if output == 'long' else []
+
+        # Filter on the partitions, and on the row groups' statistics (periods are compared as strings, so the end includes
+        # its sub-periods - e.g. '2020-03' or '2020-Q1' up to '2020')
+        filter = (pa.dataset.field('TIME_PERIOD') >= start) & (pa.dataset.field('TIME_PERIOD') <= end + '~')
+        for param, args in params.items():
+            if any(args):
+                filter &= pa.dataset.field(param).isin(args)
+
+        partitioning = pa.dataset.partitioning(pa.schema([(partition_by, pa.string())]), flavor='hive')
+        source = pa.dataset.dataset(path, schema=self._schema(dataset), format='parquet', partitioning=partitioning,
+                                    filesystem=pa.fs.LocalFileSystem(use_mmap=True), ignore_prefixes=['.', '_'])
+        table = source.to_table(filter=filter)
+
+        # Order the columns as in `get_data`, with the codelists' components as categoricals
+        components = [*dataset.parameters, *dataset.series_attrs]
+        dataframe = table.select([*components, *dataset.obs_attrs]).to_pandas()
+        for name in components:
+            if isinstance(values := dataset._match_attr(name).values, dict):
+                dataframe[name] = Categorical(dataframe[name], categories=list(values))
+
+        if output == 'long':
+            return dataframe.sort_values([*dataset.parameters, 'TIME_PERIOD'], kind='stable', ignore_index=True)
+
+        dataframes = []
+        for _, series in dataframe.groupby(list(dataset.parameters), observed=True, sort=True):
+            series_dataframe = series[list(dataset.obs_attrs)].sort_values('TIME_PERIOD', kind='stable', ignore_index=True)
+            series_dataframe.attrs.update({name: None if (value := series[name].iat[0]) != value else value for name in components})
+            dataframes.append(series_dataframe)
+
+        return dataframes
+
+    def invalidate(self, dataset_id: str | None = None) -> None:
+        """Remove the stored observations of a dataset (or of all datasets, if none is given)."""
+        from shutil import rmtree
+
+        for path in [self.directory / dataset_id] if dataset_id is not None else self.directory.iterdir():
+            rmtree(path, ignore_errors=True)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({str(self.directory)!r})"
@@ -0,0 +1,69 @@
+"""Module for parsing `/CompactData` responses incrementally - series by series, as the response is streamed.
+
+Memory is then bounded by the largest series, rather than by the whole response (and its parsed tree).
+Requires the (optional) `ijson` package.
+"""
+
+from typing import Iterable, Iterator
+
+from exceptions import WrapperException
+
+SERIES_PREFIX = 'CompactData.DataSet.Series'
+
+
+class _BytesReader:
+    """File-like adapter over an iterable of bytes chunks (as read by `ijson`)."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer = b''
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._chunks)
+            except StopIteration:
+                break
+
+        if size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+
+        return data
+
+
+def iter_series(chunks: Iterable[bytes]) -> Iterator[dict]:
+    """Parse the raw series of a `/CompactData` response from its bytes chunks, yielding each as soon as it is complete."""
+    try:
+        import ijson
+    except ImportError:
+        raise WrapperException("Streaming responses requires the `ijson` package (`pip install ijson`).") from None
+
+    events = ijson.parse(_BytesReader(chunks))
+    has_dataset = False
+
+    for prefix, event, value in events:
+
+        if prefix == 'CompactData' and event == 'map_key' and value == 'DataSet':
+            has_dataset = True
+
+        # A series is either an item of the series' list, or the single series itself
+        elif event == 'start_map' and prefix in (SERIES_PREFIX, SERIES_PREFIX + '.item'):
+            builder, depth = ijson.ObjectBuilder(), 0
+            builder.event(event, value)
+
+            for _, event, value in events:
+                builder.event(event, value)
+
+                if event in ('start_map', 'start_array'):
+                    depth += 1
+                elif event in ('end_map', 'end_array'):
+                    if depth == 0:
+                        break
+                    depth -= 1
+
+            yield builder.value
+
+    if not has_dataset:
+        raise WrapperException("Invalid json response.")
@@ -1,10 +1,12 @@
+from datetime import date
+
 from utils import is_non_string_iterable
-from requests import Session
+from globals import BASE_URL, MAX_URL_SIZE
 from exceptions import WrapperException
 
 class URLFactory:
     
-    BASE = "http://dataservices.imf.org/REST/SDMX_JSON.svc"
+    BASE = BASE_URL
     
     @classmethod
     def dataflow(self) -> str:
@@ -29,6 +31,30 @@ class URLFactory:
         
         return f"{self.BASE}/CompactData/{dataset_id}/{arguments_string}?startPeriod={start}&endPeriod={end}"
     
+    @classmethod
+    def compact_data_split(self,
+                           dataset_id: str,
+                           parameters_args: list[list[str] | str],
+                           start: str = '1900',
+                           end: str = '2100',
+                           max_size: int = MAX_URL_SIZE,
+                           years_per_shard: int | None = None) -> list[str]:
+        """Build the (fewest) `compact_data` urls that each fit `max_size` and, together, request all the arguments given.
+        If `years_per_shard` is given, each is further split into the periods' shards of that many years - in order, so
+        the observations of each series come in order across the urls."""
+        
+        # Arguments are deduplicated and sorted, so that the same request always gets the same urls (e.g. for caching)
+        parameters_args = [sorted(set(param)) if is_non_string_iterable(param) else [param] for param in parameters_args]
+        
+        # Size of the url without any arguments, i.e. what is left for the arguments' string
+        fixed_size = len(self.compact_data(dataset_id, [], start, end))
+        
+        periods = self._split_periods(start, end, years_per_shard) if years_per_shard else [(start, end)]
+        
+        return [self.compact_data(dataset_id, shard, shard_start, shard_end) 
+                    for shard in self._split_arguments(parameters_args, max_size - fixed_size)
+                        for shard_start, shard_end in periods]
+    
     @classmethod
     def generic_metadata(self, 
                          dataset_id: str, 
@@ -47,5 +73,69 @@ class URLFactory:
         
         return params_sep.join(args_sep.join(param) if is_non_string_iterable(param) else param
                                  for param in parameters_args)
-
-    
\ No newline at end of file
+    
+    @staticmethod
+    def _split_periods(start: str,
+                       end: str,
+                       years: int) -> list[tuple[str, str]]:
+        """Split the periods from `start` to `end` into consecutive shards of `years` (aligned to their multiples, e.g. 
+        to decades, so that the same years are always requested in the same shards). Shards stop at the current year - 
+        the last one requesting any periods up to `end` (e.g. projections), rather than many mostly empty shards."""
+        
+        first, last = int(start[:4]), min(int(end[:4]), date.today().year)
+        bounds = range(first - first % years + years, last + 1, years)
+        
+        return list(zip([start, *map(str, bounds)], [*(str(bound - 1) for bound in bounds), end]))
+    
+    @classmethod
+    def _split_arguments(self,
+                         parameters_args: list[list[str]],
+                         max_length: int) -> list[list[list[str]]]:
+        """Split the arguments into shards whose arguments' strings fit `max_length`.
+        
+        It first tries to split a single parameter (longest first), packing its values into as few shards as possible;
+        if no parameter can be split alone, the longest is halved and each half split further."""
+        
+        length = len(self._build_arguments_string(parameters_args))
+        if length <= max_length:
+            return [parameters_args]
+        
+        splittable = sorted((i for i, param in enumerate(parameters_args) if len(param) > 1),
+                            key=lambda i: len('+'.join(parameters_args[i])), 
+                            reverse=True)
+        if not splittable:
+            raise WrapperException(f"Arguments cannot be split to fit the maximum url size: {parameters_args}.")
+        
+        for i in splittable:
+            room = max_length - (length - len('+'.join(parameters_args[i])))
+            
+            if (chunks := self._pack_arguments(parameters_args[i], room)) is not None:
+                return [[*parameters_args[:i], chunk, *parameters_args[i+1:]] for chunk in chunks]
+        
+        i, half = splittable[0], len(parameters_args[splittable[0]]) // 2
+        
+        return [shard 
+                    for part in (parameters_args[i][:half], parameters_args[i][half:])
+                        for shard in self._split_arguments([*parameters_args[:i], part, *parameters_args[i+1:]], max_length)]
+    
+    @staticmethod
+    def _pack_arguments(args: list[str],
+                        room: int,
+                        args_sep: str = '+') -> list[list[str]] | None:
+        """Pack arguments into the fewest chunks whose joined strings fit `room` (first-fit decreasing), if possible."""
+        
+        chunks, sizes = [], []
+        for arg in sorted(args, key=len, reverse=True):
+            if len(arg) > room:
+                return None
+            
+            for k, size in enumerate(sizes):
+                if size + len(args_sep) + len(arg) <= room:
+                    chunks[k].append(arg)
+                    sizes[k] += len(args_sep) + len(arg)
+                    break
+            else:
+                chunks.append([arg])
+                sizes.append(len(arg))
+        
+        return chunks
@@ -1,8 +1,14 @@
-from typing import Iterable
+from typing import Callable, Iterable
 import httpx
+import json
 from json import JSONDecodeError
 import asyncio
 
+from globals import MAX_CONCURRENT_REQUESTS
+from exceptions import LimitExceeded, UnknownServerException
+from ratelimit import TokenBucket, global_rate_limiter
+from instrumentation import instruments
+
 import logging
 log = logging.getLogger(__name__)
 
@@ -10,38 +16,83 @@ def is_non_string_iterable(x: object) -> bool:
     return isinstance(x, Iterable) and not isinstance(x, str)
 
 
+# Decoder of all responses' json (straight from their bytes) - `orjson`'s if installed (much faster on large responses),
+# otherwise the standard library's. Both raise a `JSONDecodeError` on invalid json.
+try:
+    from orjson import loads as default_json_decoder
+except ImportError:
+    default_json_decoder = json.loads
+
+json_decoder: Callable[[bytes], object] = default_json_decoder
+
+def set_json_decoder(decoder: Callable[[bytes], object] | None) -> None:
+    """Set the decoder of all responses' json (taking their bytes), or restore the default one if None."""
+    global json_decoder
+    json_decoder = decoder or default_json_decoder
+
+def decode_json(response: httpx.Response) -> object:
+    """Decode the json content of a response, with the (set) decoder."""
+    return json_decoder(response.content)
+
+
+def check_response(response: httpx.Response,
+                   rate_limiter: TokenBucket = global_rate_limiter) -> None:
+    """Process the status code of a response from the IMF API (backing off the rate limiter when the limit is exceeded).
+    """
+    match response.status_code:
+        case 200: 
+            rate_limiter.recover()
+        case 304:  # (only on conditional requests) not modified, so there is no content to check
+            rate_limiter.recover()
+            return
+        case 302: 
+            rate_limiter.penalize()
+            instruments.count('limit_exceeded')
+            raise LimitExceeded("The limit of requests per day has been exceeded.")
+        case _:   raise UnknownServerException(f"Request to IMF API failed with status code {response.status_code}.", response.status_code)
+    
+    if "application/json" not in response.headers.get("Content-Type", ''):
+        raise UnknownServerException(f"Response from IMF API is not a valid JSON object.")
+
 def _extract_json_from_response(response: httpx.Response):
     
     if response.status_code != 200:
         log.error(f"Request {response.url} failed with status code {response.status_code}.")
     
     try:
-        return response.json()
+        return decode_json(response)
     except JSONDecodeError:
         log.error(f"Response from {response.url} is not a valid JSON object.")
 
-def get_sync_response_json(url: str) -> dict:
+def get_sync_response_json(url: str,
+                           rate_limiter: TokenBucket = global_rate_limiter,
+                           client: httpx.Client | None = None) -> dict:
     
-    with httpx.Client() as client:
+    rate_limiter.acquire()
+    if client is not None:
         response = client.get(url)
+    else:
+        with httpx.Client() as client:
+            response = client.get(url)
     
     json_content = _extract_json_from_response(response)
     return json_content
 
-def get_async_responses_json(urls: Iterable[str]) -> dict:
+def get_async_responses_json(urls: Iterable[str],
+                             max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+                             rate_limiter: TokenBucket = global_rate_limiter) -> dict:
     
     async def make_requests(urls):
-        tasks = []
-        batch_size = 10
-        total = len(urls)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def get(client, url):
+            async with semaphore:
+                await rate_limiter.aacquire()
+                return await client.get(url)
+        
         async with httpx.AsyncClient() as client:
-            
-            for k in range(0, total, batch_size):
-                async with asyncio.TaskGroup() as tg:
-                    tg.create_task(asyncio.sleep(10))
-                    
-                    tasks.extend([tg.create_task(client.get(url)) for url in urls[k:k+batch_size]])
-                    
+            async with asyncio.TaskGroup() as tg:
+                tasks = [tg.create_task(get(client, url)) for url in urls]
         
         return [_extract_json_from_response(task.result()) for task in tasks]
     
@@ -6,62 +6,57 @@ The API follows a specific logic, which the wrapper superficially replicates, na
 * for each dataset, the corresponding data (accessible by the method `data`)
 """
 
+from __future__ import annotations
 
 # outsourced imports
-from httpx import Client, AsyncClient, Response
-from re import search
-from json import JSONDecodeError
-from time import perf_counter, sleep
-from collections import deque
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from threading import Thread
+from typing import TYPE_CHECKING, Callable, Hashable, Iterable, Mapping
+from httpx import Response
 
 # local imports
-from globals import global_last_requests, BASE_URL, BASE_HEADERS, MAX_URL_SIZE
-from exceptions import LimitExceeded, UnknownServerException
+from globals import MAX_CONCURRENT_REQUESTS, CATALOG_CACHE_TTL
+from cache import DiskCache
+from catalog import DatasetCatalog
+from ratelimit import TokenBucket, global_rate_limiter
+from client import IMFClient, AsyncIMFClient
 from url import URLFactory
 from dataset import Dataset
-from models.dataset import Attribute
-from models.api import DataflowResponse, DataStructureResponse, CompactDataResponse, SeriesItem
-from utils import is_non_string_iterable    
+from batch import BatchPlan, DataRequest
+from instrumentation import instruments
+from utils import is_non_string_iterable, decode_json
 
-class IMFWrapper:
+# The data models (and pydantic) are only imported once responses are parsed
+if TYPE_CHECKING:
+    from pandas import DataFrame
+    from models.dataset import Attribute
 
-    sync_client = lambda self: Client(base_url=BASE_URL, headers=BASE_HEADERS)
-    async_client = lambda self: AsyncClient(base_url=BASE_URL, headers=BASE_HEADERS)
+import logging
+log = logging.getLogger(__name__)
+
+class _BaseIMFWrapper:
+    """Functionality shared by the sync and async wrappers (everything but the requests themselves)."""
     
-    def __init__(self):
-        """Initialize the IMFWrapper class, already making a request to the IMF API to get the available datasets.
-        """
-        # Set last requests queue for managing maximum requests per second
-        # self._last_requests = deque(maxlen=10)
-        
-        # Make request and set request time
-        with self.sync_client() as client:
-            response = client.get("/Dataflow")
-        
-        global_last_requests.append(perf_counter())
-        print(global_last_requests)
-        self._check_response(response)
+    CATALOG_KEY = 'Dataflow'
+    
+    def __init__(self,
+                 structure_cache: DiskCache | None = None,
+                 client: IMFClient | AsyncIMFClient | None = None,
+                 catalog_cache: DiskCache | None = None,
+                 catalog_ttl: float | None = CATALOG_CACHE_TTL):
         
-        # Parse json data into datasets, and set them as a property
-        parsed_data = DataflowResponse.from_raw(response.json())
-        self._datasets = {dataset.id: dataset.desc for dataset in parsed_data.datasets}
+        self._structure_cache = structure_cache
+        self._client = client
+        self._rate_limiter = client.rate_limiter
         
-    def _check_response(self,
-                        response: Response) -> None:
-        """Process the status code of a response from the IMF API.
-        """
-        match response.status_code:
-            case 200: pass
-            case 302: raise LimitExceeded("The limit of requests per day has been exceeded.")
-            case _:   raise UnknownServerException(f"Request to IMF API failed with status code {response.status_code}.")
+        # Catalog of the available datasets (loaded on `load`), and the cache it is persisted on
+        self._catalog: DatasetCatalog | None = None
+        self._catalog_cache = catalog_cache
+        self._catalog_ttl = catalog_ttl
         
-        if "application/json" not in response.headers.get("Content-Type", ''):
-            raise UnknownServerException(f"Response from IMF API is not a valid JSON object.")
-    
-    @staticmethod
-    def _dataset_has_date(description) -> bool:
-        """Check if a dataset description contains a date."""
-        return search(r"20\d{2}", description) is not None
+        # Datasets already created (returned again on `get_dataset`)
+        self._datasets_instances: dict[str, Dataset] = {}
     
     @property
     def datasets(self,
@@ -71,33 +66,115 @@ class IMFWrapper:
         """
         # Return all datasets if flag is None
         if without_dates is None:
-            return self._datasets
+            return self._catalog.datasets
         
-        # Otherwise, filter accordingly and return
-        return {dataset_id: description 
-                    for dataset_id, description in self._datasets.items() 
-                        if without_dates ^ self._dataset_has_date(description)}
+        # Otherwise, return the corresponding (precomputed) partition
+        return self._catalog.undated if without_dates else self._catalog.dated
     
-    def get_dataset(self,
-                    dataset_id: str) -> Dataset:
+    def _load_cached_catalog(self) -> bool:
+        """Load the catalog from its cache, if available, returning whether it should be revalidated (if stale)."""
+        if self._catalog_cache is not None and (catalog := self._catalog_cache.get(self.CATALOG_KEY)) is not None:
+            self._catalog = catalog
         
-        # Assert dataset is available
-        assert dataset_id in self._datasets, \
+        return self._catalog is not None and self._catalog.is_stale(self._catalog_ttl)
+    
+    def _catalog_headers(self) -> dict[str, str] | None:
+        """Headers to request the available datasets - conditional on them having changed, if a catalog is loaded."""
+        return self._catalog.validators if self._catalog is not None else None
+    
+    def _update_catalog(self,
+                        response: Response) -> None:
+        """Update the catalog from a (conditional) `/Dataflow` response, and persist it."""
+        if response.status_code == 304:
+            log.debug("List of datasets not modified.")
+            catalog = self._catalog.refreshed()
+        else:
+            with instruments.span('json_decode', endpoint='Dataflow'):
+                json_data = decode_json(response)
+            catalog = DatasetCatalog.from_datasets(self._parse_datasets(json_data),
+                                                   etag=response.headers.get('ETag'),
+                                                   last_modified=response.headers.get('Last-Modified'))
+        self._catalog = catalog
+        
+        if self._catalog_cache is not None:
+            self._catalog_cache.set(self.CATALOG_KEY, catalog)
+    
+    def _assert_dataset(self,
+                        dataset_id: str) -> None:
+        assert dataset_id in self._catalog, \
             f"Dataset {dataset_id!r} not found in the list of datasets available. Call `datasets` to get the list of available datasets."
+    
+    def _datasets_to_prefetch(self,
+                              dataset_ids: Iterable[str] | None) -> list[str]:
+        """The datasets (by default, the ones listed by `datasets`) that were not created yet."""
+        dataset_ids = self.datasets if dataset_ids is None else dataset_ids
+        return [dataset_id for dataset_id in dataset_ids if dataset_id not in self._datasets_instances]
+    
+    @staticmethod
+    def _report_prefetch(dataset_id: str,
+                         exc: BaseException | None,
+                         done: int,
+                         total: int,
+                         failed: dict[str, BaseException],
+                         progress: Callable[[int, int], None] | None) -> None:
+        if exc is not None:
+            log.warning(f"Prefetching the structure of {dataset_id!r} failed: {exc!r}")
+            failed[dataset_id] = exc
         
-        # Check whether we need to wait for the next request, and do so if necessary
-        if len(global_last_requests) == 10 and ( required_wait := perf_counter() - global_last_requests.popleft() ) < 5:
-            sleep(required_wait)
+        log.debug(f"Prefetched {done}/{total} structures.")
+        if progress is not None:
+            progress(done, total)
+    
+    def _create_dataset(self,
+                        dataset_id: str,
+                        structure: tuple) -> Dataset:
+        """Create a dataset from its structure, on the wrapper's client - unless it was created already."""
+        if (dataset := self._datasets_instances.get(dataset_id)) is not None:
+            return dataset
         
-        # Make request and set request time
-        with self.sync_client() as client:
-            response = client.get(f"/DataStructure/{dataset_id}")
+        client = {'async_client' if isinstance(self._client, AsyncIMFClient) else 'client': self._client}
+        with instruments.span('dataset_construction', dataset=dataset_id):
+            dataset = Dataset(dataset_id, *structure, **client)
         
-        global_last_requests.append(perf_counter())
-        self._check_response(response)
+        return self._datasets_instances.setdefault(dataset_id, dataset)
+    
+    def _cached_structure(self,
+                          dataset_id: str) -> tuple | None:
+        return self._structure_cache.get(dataset_id) if self._structure_cache is not None else None
+    
+    def _cache_structure(self,
+                         dataset_id: str,
+                         structure: tuple) -> None:
+        if self._structure_cache is not None:
+            self._structure_cache.set(dataset_id, structure)
+    
+    def invalidate_structure(self,
+                             dataset_id: str | None = None) -> None:
+        """Discard the cached structure of a dataset (or of all datasets, if none is given), and its created instance."""
+        if self._structure_cache is not None:
+            self._structure_cache.invalidate(dataset_id)
+        
+        if dataset_id is None:
+            self._datasets_instances.clear()
+        else:
+            self._datasets_instances.pop(dataset_id, None)
+    
+    @staticmethod
+    def _parse_datasets(json_data: dict) -> dict[str, str]:
+        """Parse the `/Dataflow` json data into a mapping of datasets to their descriptions."""
+        from models.api import DataflowResponse
+        
+        parsed_data = DataflowResponse.from_raw(json_data)
+        return {dataset.id: dataset.desc for dataset in parsed_data.datasets}
+    
+    @staticmethod
+    def _parse_structure(json_data: dict) -> tuple[list[Attribute], list[Attribute], list[Attribute], dict[str, str]]:
+        """Parse the `/DataStructure` json data of a dataset into its parameters, attributes and annotations."""
+        from models.dataset import Attribute
+        from models.api import DataStructureResponse
         
         # Parse json data into dataset information
-        parsed_data = DataStructureResponse.from_raw(response.json())
+        parsed_data = DataStructureResponse.from_raw(json_data)
         
         # Extract information on concepts and codes (required for filling information on parameters and attributes)
         concepts_info = {concept.name: concept for concept in parsed_data.concepts}
@@ -120,5 +197,276 @@ class IMFWrapper:
                 
         annotations = {annotation.title: annotation.desc for annotation in parsed_data.annotations}       
         
-        # Create and return dataset
-        return Dataset(dataset_id, parameters, obs_attrs, series_attrs, annotations)
+        return parameters, obs_attrs, series_attrs, annotations
+
+
+class IMFWrapper(_BaseIMFWrapper):
+    
+    def __init__(self,
+                 structure_cache: DiskCache | None = None,
+                 rate_limiter: TokenBucket = global_rate_limiter,
+                 client: IMFClient | None = None,
+                 lazy: bool = False,
+                 catalog_cache: DiskCache | None = None,
+                 catalog_ttl: float | None = CATALOG_CACHE_TTL):
+        """Initialize the IMFWrapper class, already loading the available datasets - unless `lazy`, in which case they are 
+        only loaded on first use (and not at all for datasets whose structure is cached).
+        
+        If a `structure_cache` is given, the datasets' structures are persisted on it, and only requested when missing or expired.
+        If a `catalog_cache` is given, the available datasets are persisted on it - and, once older than `catalog_ttl`, used
+        while they are revalidated in the background (only downloaded again if changed).
+        All requests (including the datasets' ones) go through a single pooled `client` - by default one using the `rate_limiter`,
+        shared by default by all wrappers. That default client is closed with the wrapper (by `close`, or when used as a context 
+        manager) - a given one is left open, for its owner to close.
+        """
+        super().__init__(structure_cache, client or IMFClient(rate_limiter), catalog_cache, catalog_ttl)
+        
+        self._owns_client = client is None
+        self._refresh_thread: Thread | None = None
+        if not lazy:
+            self.load()
+    
+    def load(self) -> None:
+        """Load the available datasets, if not done yet - from the catalog cache if available, otherwise requesting them."""
+        if self._catalog is not None:
+            return
+        
+        is_stale = self._load_cached_catalog()
+        
+        if self._catalog is None:
+            self.refresh_catalog()
+        elif is_stale:
+            self._refresh_thread = Thread(target=self._refresh_catalog_in_background, daemon=True)
+            self._refresh_thread.start()
+    
+    def refresh_catalog(self) -> None:
+        """Request the available datasets (only downloaded again if changed since the loaded ones were)."""
+        self._update_catalog(self._client.get(URLFactory.dataflow(), headers=self._catalog_headers()))
+    
+    def _refresh_catalog_in_background(self) -> None:
+        try:
+            self.refresh_catalog()
+        except Exception as exc:
+            log.warning(f"Revalidating the list of datasets failed ({exc!r}) - keeping the stored one.")
+    
+    @property
+    def datasets(self) -> dict[str, str]:
+        self.load()
+        return super().datasets
+    
+    def get_structures(self,
+                       dataset_ids: list[str]) -> dict[str, tuple]:
+        """Get the structures of several datasets - from cache if available, otherwise requested (concurrently)."""
+        structures = {dataset_id: self._cached_structure(dataset_id) for dataset_id in dataset_ids}
+        missing = [dataset_id for dataset_id, structure in structures.items() if structure is None]
+        
+        if missing:
+            self.load()
+            for dataset_id in missing:
+                self._assert_dataset(dataset_id)
+            
+            json_data = self._client.get_jsons([URLFactory.data_structure(dataset_id) for dataset_id in missing])
+            for dataset_id, json in zip(missing, json_data):
+                with instruments.span('structure_parse', dataset=dataset_id):
+                    structures[dataset_id] = self._parse_structure(json)
+                self._cache_structure(dataset_id, structures[dataset_id])
+        
+        return structures
+    
+    def get_dataset(self,
+                    dataset_id: str) -> Dataset:
+        """Get a dataset - created once per wrapper (so further calls return the same instance)."""
+        if (dataset := self._datasets_instances.get(dataset_id)) is not None:
+            return dataset
+        
+        with instruments.span('get_dataset', dataset=dataset_id):
+            # Get the dataset structure, from cache if available (otherwise, check it is available and request it)
+            structure = self.get_structures([dataset_id])[dataset_id]
+            
+            return self._create_dataset(dataset_id, structure)
+    
+    def prefetch_structures(self,
+                            dataset_ids: Iterable[str] | None = None,
+                            progress: Callable[[int, int], None] | None = None) -> dict[str, BaseException]:
+        """Create several datasets (by default, the ones listed by `datasets`), so that `get_dataset` returns them at once -
+        requesting the structures not cached concurrently, within the client's concurrency and at the rate limiter's pace.
+        
+        After each dataset, `progress` is called with the number of datasets done and their total. Datasets that fail are 
+        skipped, and returned with their errors.
+        """
+        self.load()
+        dataset_ids = self._datasets_to_prefetch(dataset_ids)
+        failed = {}
+        
+        with ThreadPoolExecutor(max_workers=self._client.max_concurrency) as executor:
+            futures = {executor.submit(self.get_dataset, dataset_id): dataset_id for dataset_id in dataset_ids}
+            
+            for done, future in enumerate(as_completed(futures), start=1):
+                self._report_prefetch(futures[future], future.exception(), done, len(futures), failed, progress)
+        
+        return failed
+    
+    def get_batch(self,
+                  requests: Mapping[Hashable, DataRequest | tuple]) -> dict[Hashable, list[DataFrame] | DataFrame]:
+        """Get the data of several requests (of one or more datasets) at once, by the requests' keys - e.g.:
+        
+        ```python
+        data = imf.get_batch({'ifs': ('IFS', {'FREQ': 'A', 'REF_AREA': ['US', 'PT'], 'INDICATOR': 'NGDP_XDC'}),
+                              'dots': DataRequest('DOTS', {'FREQ': 'A', 'REF_AREA': ['US', 'PT']}, output='long')})
+        ```
+        
+        All requests are validated before any data is requested, and their (distinct) urls are then all requested 
+        concurrently - within the client's concurrency and at the rate limiter's pace.
+        """
+        requests = {key: DataRequest.of(request) for key, request in requests.items()}
+        
+        with instruments.span('get_batch'):
+            # Get the datasets (their structures requested concurrently, if not cached), and plan the requests against them
+            dataset_ids = list(dict.fromkeys(request.dataset_id for request in requests.values()))
+            missing = [dataset_id for dataset_id in dataset_ids if dataset_id not in self._datasets_instances]
+            
+            for dataset_id, structure in (self.get_structures(missing) if missing else {}).items():
+                self._create_dataset(dataset_id, structure)
+            datasets = {dataset_id: self._datasets_instances[dataset_id] for dataset_id in dataset_ids}
+            
+            plan = BatchPlan.build(datasets, requests)
+            urls = plan.unique_urls
+            log.debug(f"Requesting {len(urls)} urls for {len(requests)} requests.")
+            
+            return plan.results(datasets, dict(zip(urls, self._client.get_jsons(urls))))
+    
+    def close(self) -> None:
+        if self._refresh_thread is not None:
+            self._refresh_thread.join()
+        if self._owns_client:
+            self._client.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncIMFWrapper(_BaseIMFWrapper):
+    """Asynchronous version of `IMFWrapper`, with a single pooled client, to be used as an async context manager:
+    
+    ```python
+    async with AsyncIMFWrapper() as imf:
+        ifs = await imf.get_dataset('IFS')
+        data = await ifs.aget_data(FREQ='A', REF_AREA=['US', 'PT'])
+    ```
+    """
+    
+    def __init__(self,
+                 structure_cache: DiskCache | None = None,
+                 rate_limiter: TokenBucket = global_rate_limiter,
+                 max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+                 client: AsyncIMFClient | None = None,
+                 catalog_cache: DiskCache | None = None,
+                 catalog_ttl: float | None = CATALOG_CACHE_TTL):
+        """Initialize the AsyncIMFWrapper class - the available datasets are only loaded when entering its context (or on `load`).
+        
+        At most `max_concurrency` requests (shared by all the datasets it creates) are in flight at once, unless a `client` is given
+        (which, unlike the default one, is left open by `aclose`, for its owner to close).
+        """
+        super().__init__(structure_cache, client or AsyncIMFClient(rate_limiter, max_concurrency), catalog_cache, catalog_ttl)
+        
+        self._owns_client = client is None
+        self._refresh_task: asyncio.Task | None = None
+    
+    async def load(self) -> None:
+        """Load the available datasets, if not done yet - from the catalog cache if available, otherwise requesting them."""
+        if self._catalog is not None:
+            return
+        
+        is_stale = self._load_cached_catalog()
+        
+        if self._catalog is None:
+            await self.refresh_catalog()
+        elif is_stale:
+            self._refresh_task = asyncio.create_task(self._refresh_catalog_in_background())
+    
+    async def refresh_catalog(self) -> None:
+        """Request the available datasets (only downloaded again if changed since the loaded ones were)."""
+        self._update_catalog(await self._client.get(URLFactory.dataflow(), headers=self._catalog_headers()))
+    
+    async def _refresh_catalog_in_background(self) -> None:
+        try:
+            await self.refresh_catalog()
+        except Exception as exc:
+            log.warning(f"Revalidating the list of datasets failed ({exc!r}) - keeping the stored one.")
+    
+    @property
+    def datasets(self) -> dict[str, str]:
+        assert self._catalog is not None, "Datasets not loaded yet. Use the wrapper as an async context manager, or await `load`."
+        return super().datasets
+    
+    async def get_dataset(self,
+                          dataset_id: str) -> Dataset:
+        """Get a dataset - created once per wrapper (so further calls return the same instance)."""
+        if (dataset := self._datasets_instances.get(dataset_id)) is not None:
+            return dataset
+        
+        with instruments.span('get_dataset', dataset=dataset_id):
+            # Get the dataset structure, from cache if available (otherwise, check it is available and request it)
+            structure = self._cached_structure(dataset_id)
+            
+            if structure is None:
+                await self.load()
+                self._assert_dataset(dataset_id)
+                json_data = await self._client.get_json(URLFactory.data_structure(dataset_id))
+                
+                with instruments.span('structure_parse', dataset=dataset_id):
+                    structure = self._parse_structure(json_data)
+                self._cache_structure(dataset_id, structure)
+            
+            return self._create_dataset(dataset_id, structure)
+    
+    async def prefetch_structures(self,
+                                  dataset_ids: Iterable[str] | None = None,
+                                  progress: Callable[[int, int], None] | None = None) -> dict[str, BaseException]:
+        """Asynchronous version of `IMFWrapper.prefetch_structures` (within the client's concurrency)."""
+        await self.load()
+        dataset_ids = self._datasets_to_prefetch(dataset_ids)
+        failed = {}
+        
+        async def prefetch(dataset_id: str) -> tuple[str, BaseException | None]:
+            try:
+                await self.get_dataset(dataset_id)
+            except Exception as exc:
+                return dataset_id, exc
+            return dataset_id, None
+        
+        for done, result in enumerate(asyncio.as_completed([prefetch(dataset_id) for dataset_id in dataset_ids]), start=1):
+            self._report_prefetch(*(await result), done, len(dataset_ids), failed, progress)
+        
+        return failed
+    
+    async def get_batch(self,
+                        requests: Mapping[Hashable, DataRequest | tuple]) -> dict[Hashable, list[DataFrame] | DataFrame]:
+        """Asynchronous version of `IMFWrapper.get_batch` (within the client's concurrency)."""
+        requests = {key: DataRequest.of(request) for key, request in requests.items()}
+        
+        with instruments.span('get_batch'):
+            dataset_ids = list(dict.fromkeys(request.dataset_id for request in requests.values()))
+            datasets = dict(zip(dataset_ids, await asyncio.gather(*(self.get_dataset(dataset_id) for dataset_id in dataset_ids))))
+            
+            plan = BatchPlan.build(datasets, requests)
+            urls = plan.unique_urls
+            log.debug(f"Requesting {len(urls)} urls for {len(requests)} requests.")
+            
+            return plan.results(datasets, dict(zip(urls, await self._client.get_jsons(urls))))
+    
+    async def aclose(self) -> None:
+        if self._refresh_task is not None:
+            await self._refresh_task
+        if self._owns_client:
+            await self._client.aclose()
+    
+    async def __aenter__(self):
+        await self.load()
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
@@ -0,0 +1,129 @@
+import sys
+from pathlib import Path
+
+# The package's modules import each other by their bare names (e.g. `from globals import ...`)
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+
+import asyncio
+from threading import Lock
+from time import sleep
+import httpx
+import pytest
+
+@pytest.fixture
+def ifs():
+    """A dataset with a frequency and an area parameter (the latter with 200 codes), and a value per period."""
+    from dataset import Dataset
+    from models.dataset import Attribute
+    
+    return Dataset('IFS',
+                   [Attribute(name='FREQ', desc='Frequency', values={'A': 'Annual', 'M': 'Monthly'}),
+                    Attribute(name='REF_AREA', desc='Area', values={f"A{i:03d}": f"Area {i}" for i in range(200)})],
+                   [Attribute(name='TIME_PERIOD', desc='Time', values='DateTime'),
+                    Attribute(name='OBS_VALUE', desc='Value', values='Double')],
+                   [], {})
+
+class FakeAPI:
+    """A stand-in for the IMF's API (served through httpx's mock transport), recording the urls requested.
+    
+    Its datasets (IFS, DOTS and BAD) have a frequency and an area parameter, with a series per combination of them, and an observation per
+    year from 2000 to 2009 - and urls containing any of the `failing` strings are not found.
+    The next requests can also be answered with given (error) `statuses`, or after given `delays` (in seconds), in order.
+    The list of datasets is tagged with an `etag`, and not sent again (but `not_modified`) to requests with it.
+    """
+    
+    AREAS = ['US', 'PT', 'GB']
+    
+    def __init__(self, failing: set[str] = ()):
+        self.failing = set(failing)
+        self.statuses: list[int] = []
+        self.delays: list[float] = []
+        self.etag = '"1"'
+        self.not_modified = 0
+        self.urls: list[str] = []
+        self.clients: list = []
+        self._lock = Lock()
+    
+    def structure(self) -> dict:
+        codelist = lambda id_, codes: {'@id': id_, 'Code': [{'@value': code, 'Description': {'#text': code}} for code in codes]}
+        concept = lambda id_, text_type=None: {'@id': id_, 'Name': {'#text': id_}, **({'TextFormat': {'@textType': text_type}} if text_type else {})}
+        return {'Structure': {
+            'CodeLists': {'CodeList': [codelist('CL_FREQ', ['A', 'M']), codelist('CL_AREA', self.AREAS)]},
+            'Concepts': {'ConceptScheme': {'Concept': [concept('FREQ'), concept('REF_AREA'), concept('TIME_PERIOD', 'DateTime'),
+                                                       concept('OBS_VALUE', 'Double'), concept('OBS_STATUS', 'String')]}},
+            'KeyFamilies': {'KeyFamily': {'Components': {
+                'Dimension': [{'@conceptRef': 'FREQ', '@codelist': 'CL_FREQ'}, {'@conceptRef': 'REF_AREA', '@codelist': 'CL_AREA'}],
+                'TimeDimension': {'@conceptRef': 'TIME_PERIOD'},
+                'PrimaryMeasure': {'@conceptRef': 'OBS_VALUE'},
+                'Attribute': [{'@conceptRef': 'OBS_STATUS'}]},
+                'Annotations': {'Annotation': [{'AnnotationTitle': 'Latest Update Date', 'AnnotationText': {'#text': '01/01/2023'}}]}}}}}
+    
+    def dataflow(self) -> dict:
+        return {'Structure': {'Dataflows': {'Dataflow': [{'Name': {'#text': dataset_id}, 'KeyFamilyRef': {'KeyFamilyID': dataset_id}}
+                                                         for dataset_id in ('IFS', 'DOTS', 'BAD')]}}}
+    
+    def compact_data(self, key: str, start: str, end: str) -> dict:
+        codes = key.split('.') + [''] * (1 - key.count('.'))
+        freqs, areas = (codes.split('+') if codes else default for codes, default in zip(codes, (['A', 'M'], self.AREAS)))
+        years = range(max(int(start[:4]), 2000), min(int(end[:4]), 2009) + 1)
+        
+        series = [{'@FREQ': freq, '@REF_AREA': area, 'Obs': [{'@TIME_PERIOD': str(year), '@OBS_VALUE': str(year / 10)} for year in years]}
+                  for freq in freqs for area in areas if years]
+        return {'CompactData': {'DataSet': {'Series': series} if series else {}}}
+    
+    def _next(self, replies: list) -> object | None:
+        with self._lock:
+            return replies.pop(0) if replies else None
+    
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.urls.append(str(request.url))
+        sleep(self._next(self.delays) or 0)
+        return self.respond(request)
+    
+    async def ahandle(self, request: httpx.Request) -> httpx.Response:
+        self.urls.append(str(request.url))
+        await asyncio.sleep(self._next(self.delays) or 0)
+        return self.respond(request)
+    
+    def respond(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        
+        if (status := self._next(self.statuses)) is not None:
+            return httpx.Response(status)
+        elif any(failing in str(request.url) for failing in self.failing):
+            return httpx.Response(404)
+        elif path.endswith('/Dataflow') and request.headers.get('If-None-Match') == self.etag:
+            self.not_modified += 1
+            return httpx.Response(304)
+        elif path.endswith('/Dataflow'):
+            return httpx.Response(200, json=self.dataflow(), headers={'ETag': self.etag})
+        elif '/DataStructure/' in path:
+            body = self.structure()
+        elif '/CompactData/' in path:
+            body = self.compact_data(path.split('/CompactData/')[1].partition('/')[2], request.url.params['startPeriod'], request.url.params['endPeriod'])
+        else:
+            return httpx.Response(404)
+        return httpx.Response(200, json=body)
+    
+    def client(self, *args, **kwargs) -> httpx.Client:
+        self.clients.append(client := httpx.Client(*args, transport=httpx.MockTransport(self.handle), **kwargs))
+        return client
+    
+    def async_client(self, *args, **kwargs) -> httpx.AsyncClient:
+        self.clients.append(client := httpx.AsyncClient(*args, transport=httpx.MockTransport(self.ahandle), **kwargs))
+        return client
+
+@pytest.fixture
+def api(monkeypatch):
+    """A stand-in for the IMF's API, which the clients created (on the `client` module) request instead."""
+    api = FakeAPI(failing={'/DataStructure/BAD'})
+    monkeypatch.setattr('client.Client', api.client)
+    monkeypatch.setattr('client.AsyncClient', api.async_client)
+    return api
+
+@pytest.fixture
+def rate_limiter():
+    """A rate limiter not slowing down the requests (of the tests)."""
+    from ratelimit import TokenBucket
+    return TokenBucket(rate=1_000, burst=1_000)
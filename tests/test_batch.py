@@ -0,0 +1,27 @@
+import pytest
+from batch import BatchPlan, DataRequest
+
+def test_batch_plan(ifs):
+    """Test that a batch's requests are validated up front, and that their urls are deduplicated."""
+    datasets = {'IFS': ifs}
+    requests = {'us': DataRequest.of(('IFS', {'FREQ': 'A', 'REF_AREA': ['A001', 'A000']})),
+                'us-long': DataRequest('IFS', {'FREQ': 'A', 'REF_AREA': ['A000', 'A001']}, output='long'),
+                'pt': DataRequest('IFS', {'FREQ': 'M', 'REF_AREA': 'A002'})}
+    
+    plan = BatchPlan.build(datasets, requests)
+    assert len(plan.unique_urls) == 2
+    
+    series = {'@FREQ': 'A', '@REF_AREA': 'A000', 'Obs': [{'@TIME_PERIOD': '2020', '@OBS_VALUE': '1'}]}
+    json_data = {url: {'CompactData': {'DataSet': {'Series': series} if 'A.' in url else {}}} for url in plan.unique_urls}
+    results = plan.results(datasets, json_data)
+    
+    assert len(results['us']) == 1 and len(results['us-long']) == 1 and results['pt'] == []
+    
+    with pytest.raises(AssertionError, match='invalid'):
+        BatchPlan.build(datasets, {'xx': DataRequest('IFS', {'REF_AREA': 'XX'})})
+
+@pytest.mark.parametrize('options', [{'output': 'long', 'periods': 'period'}, {'shard_periods': 'yes'}, {'shard_periods': 0}])
+def test_data_request_validated(options):
+    """Test that invalid requests are rejected when created (so before any data of a batch is requested)."""
+    with pytest.raises(AssertionError):
+        DataRequest('IFS', {'FREQ': 'A'}, **options)
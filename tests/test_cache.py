@@ -0,0 +1,100 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep, time
+from cache import DiskCache, ResponseCache
+
+def test_disk_cache_roundtrip(tmp_path):
+    """Test storing, getting and invalidating entries."""
+    cache = DiskCache(tmp_path)
+    cache.set('IFS', {'parameters': ['FREQ', 'REF_AREA']})
+    
+    assert 'IFS' in cache
+    assert cache.get('IFS') == {'parameters': ['FREQ', 'REF_AREA']}
+    
+    cache.invalidate('IFS')
+    assert cache.get('IFS') is None
+
+def test_disk_cache_expiration(tmp_path):
+    """Test that entries older than the ttl are discarded."""
+    cache = DiskCache(tmp_path, ttl=60)
+    cache.set('IFS', 1)
+    
+    path = cache._path('IFS')
+    os.utime(path, (time(), time() - 120))
+    
+    assert 'IFS' not in cache
+    assert cache.get('IFS', 'missing') == 'missing'
+
+def test_disk_cache_eviction(tmp_path):
+    """Test that the least recently used entries are evicted past the size limit."""
+    cache = DiskCache(tmp_path, max_bytes=2500)
+    
+    cache.set('A', b'a' * 1000)
+    os.utime(cache._path('A'), (time() - 10, time()))
+    cache.set('B', b'b' * 1000)
+    cache.set('C', b'c' * 1000)
+    
+    assert 'A' not in cache
+    assert cache.get('B') and cache.get('C')
+
+def test_response_cache_eviction():
+    """Test that the least recently used responses are evicted past the size limit."""
+    cache = ResponseCache(max_bytes=25)
+    
+    for key in 'ABC':
+        cache.get_or_fetch(key, lambda: (key, 10))
+    
+    assert 'A' not in cache and cache.get('B') == 'B' and cache.get('C') == 'C'
+
+def test_response_cache_coalescing():
+    """Test that identical fetches in flight at once share a single one."""
+    cache = ResponseCache()
+    calls = []
+    
+    def fetch():
+        calls.append(1)
+        sleep(0.1)
+        return {'data': 1}, 10
+    
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: cache.get_or_fetch('url', fetch), range(4)))
+    
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+def test_response_cache_owner_cancelled():
+    """Test that cancelling the task fetching a key does not cancel the other tasks awaiting it."""
+    cache = ResponseCache()
+    calls = []
+    
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {'data': 1}, 10
+    
+    async def main():
+        owner = asyncio.create_task(cache.aget_or_fetch('url', fetch))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(cache.aget_or_fetch('url', fetch)) for _ in range(2)]
+        await asyncio.sleep(0)
+        
+        owner.cancel()
+        results = await asyncio.gather(*waiters)
+        
+        assert owner.cancelled()
+        assert results == [{'data': 1}] * 2
+    
+    asyncio.run(main())
+    assert len(calls) == 2
+
+def test_disk_cache_concurrent_writes(tmp_path):
+    """Test that threads writing the same key at once never leave a partial (or missing) entry."""
+    cache = DiskCache(tmp_path)
+    value = {'codes': list(range(100_000))}
+    
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: cache.set('IFS', value), range(32)))
+    
+    assert cache.get('IFS') == value
+    assert not list(tmp_path.glob('*.tmp'))
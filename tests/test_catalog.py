@@ -0,0 +1,19 @@
+from time import time
+from catalog import DatasetCatalog
+
+def test_catalog_partitions():
+    """Test that the datasets are partitioned by whether their description contains a date."""
+    catalog = DatasetCatalog.from_datasets({'IFS': 'International Financial Statistics', 'WEO2021': 'World Economic Outlook 2021'})
+    
+    assert catalog.undated == {'IFS': 'International Financial Statistics'}
+    assert catalog.dated == {'WEO2021': 'World Economic Outlook 2021'}
+    assert 'IFS' in catalog and 'WEO2021' in catalog
+
+def test_catalog_revalidation():
+    """Test staleness and the conditional request headers."""
+    catalog = DatasetCatalog.from_datasets({'IFS': 'International Financial Statistics'}, etag='"v1"')
+    
+    assert not catalog.is_stale(60) and not catalog.is_stale(None)
+    assert DatasetCatalog({}, {}, {}, fetched_at=time() - 120).is_stale(60)
+    assert catalog.validators == {'If-None-Match': '"v1"'}
+    assert catalog.refreshed().fetched_at >= catalog.fetched_at
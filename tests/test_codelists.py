@@ -0,0 +1,16 @@
+import pickle
+import pytest
+from codelists import codelists
+from models.dataset import Attribute
+
+def test_codelists_shared():
+    """Test that attributes with the same codes share a single immutable codelist, also once unpickled."""
+    area = Attribute(name='REF_AREA', desc='Area', values={'US': 'United States', 'PT': 'Portugal'})
+    counterpart = Attribute(name='COUNTERPART_AREA', desc='Counterpart', values={'US': 'United States', 'PT': 'Portugal'})
+    
+    assert area.values is counterpart.values
+    assert pickle.loads(pickle.dumps(area)).values is area.values
+    assert codelists.intern({'US': 'United States'}) is not area.values
+    
+    with pytest.raises(TypeError):
+        area.values['FR'] = 'France'
@@ -0,0 +1,43 @@
+import pytest
+from columnar import ColumnarParser
+from models.dataset import Attribute
+from exceptions import WrapperException
+
+FREQ = Attribute(name='FREQ', desc='Frequency', values={'A': 'Annual', 'Q': 'Quarterly'})
+TIME_PERIOD = Attribute(name='TIME_PERIOD', desc='Time', values='DateTime')
+OBS_VALUE = Attribute(name='OBS_VALUE', desc='Value', values='Double')
+
+def compact_data(series):
+    return {'CompactData': {'DataSet': {'Series': series}}}
+
+def test_columnar_parser():
+    """Test that raw series are parsed into typed columns, with the series attributes set on the dataframe."""
+    parser = ColumnarParser([FREQ], [TIME_PERIOD, OBS_VALUE])
+    
+    dataframes = parser.to_dataframes(compact_data({'@FREQ': 'A', 'Obs': [{'@TIME_PERIOD': '2020', '@OBS_VALUE': '1.5'},
+                                                                          {'@TIME_PERIOD': '2021'}]}))
+    
+    assert len(dataframes) == 1
+    assert dataframes[0].attrs == {'FREQ': 'A'}
+    assert dataframes[0]['OBS_VALUE'].dtype == 'float64'
+    assert dataframes[0]['OBS_VALUE'].isna().tolist() == [False, True]
+
+def test_columnar_parser_validates_codes():
+    """Test that series attributes outside the dataset's codelists are rejected."""
+    parser = ColumnarParser([FREQ], [TIME_PERIOD, OBS_VALUE])
+    
+    with pytest.raises(WrapperException):
+        parser.to_dataframes(compact_data([{'@FREQ': 'M', 'Obs': []}]))
+
+def test_columnar_parser_long_dataframe():
+    """Test that series are built into a single dataframe, with categorical series attributes over the codelists."""
+    parser = ColumnarParser([FREQ], [TIME_PERIOD, OBS_VALUE])
+    
+    dataframe = parser.to_long_dataframe([{'@FREQ': 'A', 'Obs': [{'@TIME_PERIOD': '2020', '@OBS_VALUE': '1'}]},
+                                          {'@FREQ': 'Q', 'Obs': [{'@TIME_PERIOD': '2020-Q1', '@OBS_VALUE': '2'},
+                                                                 {'@TIME_PERIOD': '2020-Q2', '@OBS_VALUE': '3'}]}])
+    
+    assert list(dataframe.columns) == ['FREQ', 'TIME_PERIOD', 'OBS_VALUE']
+    assert dataframe['FREQ'].tolist() == ['A', 'Q', 'Q']
+    assert list(dataframe['FREQ'].cat.categories) == ['A', 'Q']
+    assert dataframe['OBS_VALUE'].tolist() == [1., 2., 3.]
@@ -0,0 +1,41 @@
+import pytest
+from datetime import date
+
+def test_periods_sharding(ifs, monkeypatch):
+    """Test that the periods' shards are chosen from the estimated observations, in decades or else in fewer years."""
+    assert len(ifs._build_urls((), {'FREQ': 'A', 'REF_AREA': 'A000'}, shard_periods=True)) == 1
+    assert len(ifs._build_urls((), {'FREQ': 'M'}, '1900', '2000', shard_periods=True)) == 6
+    assert ifs._years_per_shard(ifs._build_params((), {'FREQ': 'A'}), '1900', '2000') is None
+    assert ifs._years_per_shard(ifs._build_params((), {'FREQ': 'M'}), '1900', '2000') == 20
+    assert ifs._years_per_shard(ifs._build_params((), {}), '1900', '2000') == 10
+    
+    for maximum, years in ((15_000, 5), (6_000, 2), (3_000, 1)):
+        monkeypatch.setattr('dataset.MAX_OBSERVATIONS_PER_REQUEST', maximum)
+        assert ifs._years_per_shard(ifs._build_params((), {'FREQ': 'M'}), '1900', '2000') == years
+
+def test_periods_sharding_stops_at_current_year(ifs):
+    """Test that shards stop at the current year, the last one requesting any later periods."""
+    urls = ifs._build_urls((), {'FREQ': 'M'}, start='1990', shard_periods=10)
+    
+    assert urls[-1].endswith('endPeriod=2100')
+    assert int(urls[-1].split('startPeriod=')[1][:4]) <= date.today().year
+    assert len(urls) == date.today().year // 10 - 199 + 1
+
+def test_stitch_series(ifs):
+    """Test that series split across responses are stitched back together, in order."""
+    responses = [{'CompactData': {'DataSet': {'Series': {'@FREQ': 'A', '@REF_AREA': 'A000', 'Obs': {'@TIME_PERIOD': '2019'}}}}},
+                 {'CompactData': {'DataSet': {}}},
+                 {'CompactData': {'DataSet': {'Series': [{'@FREQ': 'A', '@REF_AREA': 'A000', 'Obs': [{'@TIME_PERIOD': '2020'}]},
+                                                         {'@FREQ': 'A', '@REF_AREA': 'A001', 'Obs': [{'@TIME_PERIOD': '2020'}]}]}}}]
+    
+    dataframes = ifs._to_dataframes(ifs._stitch_series(responses), engine='columnar')
+    
+    assert [dataframe.attrs['REF_AREA'] for dataframe in dataframes] == ['A000', 'A001']
+    assert dataframes[0]['TIME_PERIOD'].tolist() == ['2019', '2020']
+    assert responses[0]['CompactData']['DataSet']['Series']['Obs'] == {'@TIME_PERIOD': '2019'}
+
+def test_periods_sharding_validated(ifs):
+    """Test that invalid periods' sharding is rejected."""
+    for shard_periods in ('yes', 2.5, 0):
+        with pytest.raises(AssertionError):
+            ifs._build_urls((), {'FREQ': 'A'}, shard_periods=shard_periods)
@@ -0,0 +1,27 @@
+from extractor import DatasetExtractor
+from store import ParquetStore
+from wrapper import IMFWrapper
+
+def test_extraction_resumed(api, rate_limiter, tmp_path):
+    """Test that an interrupted extraction resumes with the shards not done, into data readable by the parquet store."""
+    api.failing.add('/IFS/.GB?')
+    
+    with IMFWrapper(rate_limiter=rate_limiter) as imf:
+        ifs = imf.get_dataset('IFS')
+        extractor = DatasetExtractor(ifs, tmp_path, partition_by='REF_AREA', max_values_per_shard=1)
+        
+        manifest = extractor.run()
+        assert sorted(shard['status'] for shard in manifest['shards'].values()) == ['done', 'done', 'failed']
+        
+        api.failing.clear()
+        api.urls.clear()
+        manifest = DatasetExtractor(ifs, tmp_path, partition_by='REF_AREA', max_values_per_shard=1).run()
+        
+        assert [shard['status'] for shard in manifest['shards'].values()] == ['done'] * 3
+        assert len(api.urls) == 1 and '/IFS/.GB?' in api.urls[0]
+        
+        data = ParquetStore(tmp_path).read(ifs, {'FREQ': [''], 'REF_AREA': ['']}, output='long')
+        assert len(data) == 2 * 3 * 10
+        assert sorted(data['REF_AREA'].unique()) == ['GB', 'PT', 'US']
+        assert ParquetStore(tmp_path).read(ifs, {'FREQ': ['A'], 'REF_AREA': ['PT']}, start='2005')[0]['OBS_VALUE'].tolist() == \
+            [200.5, 200.6, 200.7, 200.8, 200.9]
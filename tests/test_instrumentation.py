@@ -0,0 +1,23 @@
+import pytest
+from instrumentation import Instruments, Metrics
+
+def test_metrics_aggregation():
+    """Test that spans and counters are aggregated by name, over their attributes."""
+    instruments = Instruments()
+    metrics = instruments.add(Metrics())
+    
+    with instruments.span('request', endpoint='CompactData'):
+        pass
+    with pytest.raises(ValueError), instruments.span('request', endpoint='Dataflow'):
+        raise ValueError
+    
+    instruments.count('bytes', 100, endpoint='CompactData')
+    instruments.count('bytes', 50, endpoint='Dataflow')
+    
+    snapshot = metrics.snapshot()
+    assert snapshot['spans']['request']['count'] == 2
+    assert snapshot['counters'] == {'bytes': 150}
+    
+    instruments.remove(metrics)
+    instruments.count('bytes', 100)
+    assert metrics.snapshot()['counters'] == {'bytes': 150}
@@ -0,0 +1,29 @@
+import pytest
+from pandas import Period, Timestamp
+from columnar import ColumnarParser
+from models.dataset import Attribute
+from periods import period_index
+from exceptions import WrapperException
+
+def test_period_index():
+    """Test that periods are parsed by their frequency (or inferred from their format)."""
+    assert list(period_index(['2019', '2020'], 'A')) == [Period('2019', 'Y'), Period('2020', 'Y')]
+    assert list(period_index(['2020-Q1', '2021-Q4'], 'Q')) == [Period('2020Q1', 'Q'), Period('2021Q4', 'Q')]
+    assert list(period_index(['2020-01', '2020-12'])) == [Period('2020-01', 'M'), Period('2020-12', 'M')]
+    assert list(period_index(['2020-B2'], 'B', kind='timestamp')) == [Timestamp('2020-07-01')]
+    
+    with pytest.raises(WrapperException):
+        period_index(['2020-Q1', '2020'], 'Q')
+
+def test_dataframe_indexed_by_period():
+    """Test that a series' dataframe is indexed by its periods, by the frequency of the series."""
+    parser = ColumnarParser([Attribute(name='FREQ', desc='Frequency', values={'M': 'Monthly'})],
+                            [Attribute(name='TIME_PERIOD', desc='Time', values='DateTime'),
+                             Attribute(name='OBS_VALUE', desc='Value', values='Double')])
+    
+    dataframe = parser.to_dataframe({'@FREQ': 'M', 'Obs': [{'@TIME_PERIOD': '2020-03', '@OBS_VALUE': '1'},
+                                                           {'@TIME_PERIOD': '2020-04', '@OBS_VALUE': '2'}]}, periods='timestamp')
+    
+    assert list(dataframe.index) == [Timestamp('2020-03-01'), Timestamp('2020-04-01')]
+    assert list(dataframe.columns) == ['OBS_VALUE']
+    assert dataframe.attrs == {'FREQ': 'M'}
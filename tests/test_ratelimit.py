@@ -0,0 +1,36 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
+from ratelimit import TokenBucket
+
+def test_token_bucket_paces_threads():
+    """Test that requests beyond the burst are paced at the rate, across threads."""
+    limiter = TokenBucket(rate=100, burst=5)
+    
+    start = monotonic()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: limiter.acquire(), range(25)))
+    
+    assert 0.18 <= monotonic() - start < 0.5
+
+def test_token_bucket_async():
+    """Test that async callers are paced by the same bucket."""
+    limiter = TokenBucket(rate=100, burst=5)
+    
+    async def main():
+        await asyncio.gather(*(limiter.aacquire() for _ in range(15)))
+    
+    start = monotonic()
+    asyncio.run(main())
+    assert 0.08 <= monotonic() - start < 0.4
+
+def test_token_bucket_backoff():
+    """Test that the rate is reduced when the limit is exceeded, and recovered afterwards."""
+    limiter = TokenBucket(rate=10, burst=10, backoff=2)
+    
+    limiter.penalize()
+    assert limiter.current_rate == 5
+    
+    for _ in range(100):
+        limiter.recover()
+    assert limiter.current_rate == 10
@@ -0,0 +1,110 @@
+import asyncio
+from time import sleep
+import pytest
+from client import IMFClient, AsyncIMFClient
+from exceptions import CircuitOpen, LimitExceeded, UnknownServerException
+from instrumentation import Metrics, instruments
+from resilience import CircuitBreaker, RetryPolicy, is_transient
+from url import URLFactory
+
+def test_transient_failures():
+    """Test that only failures that may succeed if retried are transient."""
+    assert is_transient(LimitExceeded())
+    assert is_transient(UnknownServerException("", 503)) and is_transient(UnknownServerException(""))
+    assert not is_transient(UnknownServerException("", 404)) and not is_transient(ValueError())
+
+def test_retry_delays():
+    """Test that the delays are one less than the attempts, and bounded by the (doubling) back-off."""
+    delays = list(RetryPolicy(attempts=4, backoff=1, max_backoff=3).delays())
+    
+    assert len(delays) == 3
+    assert all(0 <= delay <= bound for delay, bound in zip(delays, [1, 2, 3]))
+
+def test_circuit_breaker():
+    """Test that the circuit opens after consecutive failures, and closes after a successful trial."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    
+    breaker.record(LimitExceeded())
+    breaker.record(UnknownServerException("", 404))
+    breaker.record(LimitExceeded())
+    assert breaker.state == 'closed'
+    
+    breaker.record(LimitExceeded())
+    with pytest.raises(CircuitOpen):
+        breaker.before_request()
+    
+    sleep(0.05)
+    breaker.before_request()
+    with pytest.raises(CircuitOpen):
+        breaker.before_request()
+    
+    breaker.record(None)
+    assert breaker.state == 'closed'
+
+def test_client_retries(api, rate_limiter, monkeypatch):
+    """Test that transient failures are retried by the clients, each attempt going through the rate limiter."""
+    tokens = []
+    
+    async def aacquire():
+        tokens.append('async')
+    
+    monkeypatch.setattr(rate_limiter, 'acquire', lambda: tokens.append('sync'))
+    monkeypatch.setattr(rate_limiter, 'aacquire', aacquire)
+    policy = RetryPolicy(attempts=3, backoff=0.01)
+    
+    api.statuses += [503]
+    with IMFClient(rate_limiter, retry_policy=policy) as client:
+        assert client.get_json(URLFactory.dataflow())
+    
+    async def main():
+        async with AsyncIMFClient(rate_limiter, retry_policy=policy) as client:
+            return await client.get_json(URLFactory.dataflow())
+    
+    api.statuses += [503, 503]
+    assert asyncio.run(main())
+    assert tokens == ['sync'] * 2 + ['async'] * 3 and len(api.urls) == 5
+    
+    api.statuses += [404]
+    with IMFClient(rate_limiter, retry_policy=policy) as client, pytest.raises(UnknownServerException):
+        client.get(URLFactory.dataflow())
+    assert len(api.urls) == 6
+
+def test_client_hedging(api, rate_limiter):
+    """Test that a request not answered in time is duplicated once, the first response being used."""
+    metrics = instruments.add(Metrics())
+    
+    try:
+        api.delays += [0.5]
+        with IMFClient(rate_limiter, hedge_after=0.05) as client:
+            assert client.get(URLFactory.dataflow()).status_code == 200
+        
+        async def main():
+            async with AsyncIMFClient(rate_limiter, hedge_after=0.05) as client:
+                return await client.get(URLFactory.dataflow())
+        
+        api.delays += [0.5]
+        assert asyncio.run(main()).status_code == 200
+    finally:
+        instruments.remove(metrics)
+    
+    assert metrics.snapshot()['counters']['hedged_requests'] == 2
+    assert len(api.urls) == 4
+
+def test_client_circuit_breaker(api, rate_limiter):
+    """Test that the clients fail at once, without a request, while their circuit breaker is open."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    
+    api.statuses += [503]
+    with IMFClient(rate_limiter, retry_policy=None, circuit_breaker=breaker) as client:
+        with pytest.raises(UnknownServerException):
+            client.get(URLFactory.dataflow())
+        with pytest.raises(CircuitOpen):
+            client.get(URLFactory.dataflow())
+    
+    async def main():
+        async with AsyncIMFClient(rate_limiter, circuit_breaker=breaker) as client:
+            await client.get(URLFactory.dataflow())
+    
+    with pytest.raises(CircuitOpen):
+        asyncio.run(main())
+    assert len(api.urls) == 1
@@ -0,0 +1,20 @@
+from models.dataset import Attribute
+from search import CodelistIndex
+
+def test_codelist_index():
+    """Test looking up codes and searching descriptions across datasets."""
+    index = CodelistIndex()
+    area = Attribute(name='REF_AREA', desc='Reference Area', values={'US': 'United States', 'PT': 'Portugal'})
+    indicator = Attribute(name='INDICATOR', desc='Indicator', values={'NGDP_XDC': 'Gross Domestic Product, Nominal'})
+    value = Attribute(name='OBS_VALUE', desc='Value', values='Double')
+    
+    index.add('IFS', [area, indicator], [value], [])
+    index.add('DOTS', [area], [value], [])
+    
+    assert [(m.dataset, m.component) for m in index.lookup('us')] == [('IFS', 'REF_AREA'), ('DOTS', 'REF_AREA')]
+    assert [m.code for m in index.search('gross dom')] == ['NGDP_XDC']
+    assert [m.dataset for m in index.search('portu', dataset='DOTS')] == ['DOTS']
+    assert index.search('value', limit=1)[0].code is None
+    
+    index.remove('IFS')
+    assert index.datasets == {'DOTS'} and index.search('gross') == []
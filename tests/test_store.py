@@ -0,0 +1,107 @@
+from pandas import DataFrame
+from store import SeriesStore
+
+def series(periods, values, **attrs):
+    dataframe = DataFrame({'TIME_PERIOD': periods, 'OBS_VALUE': values})
+    dataframe.attrs.update(attrs)
+    return dataframe
+
+def test_series_store_merge(tmp_path):
+    """Test that refreshed series are merged into the stored ones, reporting what changed."""
+    store = SeriesStore(tmp_path)
+    parameters = ('FREQ', 'REF_AREA')
+    
+    report = store.merge('IFS', parameters, [series(['2020', '2021'], [1., 2.], FREQ='A', REF_AREA='US')], '1900')
+    assert report.new_series == ['A.US']
+    assert store.last_periods('IFS', {'FREQ': ['A'], 'REF_AREA': ['']}) == {'A.US': '2021'}
+    
+    report = store.merge('IFS', parameters, [series(['2021', '2022'], [2.5, 3.], FREQ='A', REF_AREA='US')], '2021')
+    assert report.new_observations == {'A.US': 1}
+    assert report.revised_observations == {'A.US': 1}
+    assert store.get('IFS', 'A.US')['OBS_VALUE'].tolist() == [1., 2.5, 3.]
+    
+    report = store.merge('IFS', parameters, [series(['2022'], [3.], FREQ='A', REF_AREA='US')], '2022')
+    assert not report.changed
+    assert store.last_periods('IFS', {'FREQ': ['Q'], 'REF_AREA': ['']}) == {}
+
+def test_parquet_store_query(tmp_path):
+    """Test that stored observations are merged by series and period, and queried like `get_data`."""
+    from dataset import Dataset
+    from models.dataset import Attribute
+    from store import ParquetStore
+    
+    dataset = Dataset('IFS',
+                      [Attribute(name='FREQ', desc='Frequency', values={'A': 'Annual', 'Q': 'Quarterly'}),
+                       Attribute(name='REF_AREA', desc='Area', values={'US': 'United States', 'FR': 'France', 'DE': 'Germany'})],
+                      [Attribute(name='TIME_PERIOD', desc='Time', values='DateTime'),
+                       Attribute(name='OBS_VALUE', desc='Value', values='Double')],
+                      [], {})
+    store = ParquetStore(tmp_path)
+    
+    store.write(dataset, [series(['2020', '2021'], [1., 2.], FREQ='A', REF_AREA='US'),
+                          series(['2020-Q1', '2020-Q2'], [3., 4.], FREQ='Q', REF_AREA='FR')])
+    store.write(dataset, [series(['2021', '2022'], [2.5, 3.], FREQ='A', REF_AREA='US')])
+    assert store.partition_of('IFS') == 'REF_AREA'
+    
+    dataframes = dataset.query(store, FREQ='A', start='2021')
+    assert len(dataframes) == 1
+    assert dataframes[0].attrs == {'FREQ': 'A', 'REF_AREA': 'US'}
+    assert dataframes[0]['OBS_VALUE'].tolist() == [2.5, 3.]
+    
+    dataframe = dataset.query(store, REF_AREA=['FR', 'DE'], end='2020', output='long')
+    assert list(dataframe.columns) == ['FREQ', 'REF_AREA', 'TIME_PERIOD', 'OBS_VALUE']
+    assert list(dataframe['REF_AREA'].cat.categories) == ['US', 'FR', 'DE']
+    assert dataframe['TIME_PERIOD'].tolist() == ['2020-Q1', '2020-Q2']
+
+def test_refresh_backfills_new_series(tmp_path, monkeypatch):
+    """Test that series newly matching a wildcard argument are refreshed with their whole history."""
+    from dataset import Dataset
+    from models.dataset import Attribute
+    
+    dataset = Dataset('IFS',
+                      [Attribute(name='FREQ', desc='Frequency', values={'A': 'Annual'}),
+                       Attribute(name='REF_AREA', desc='Area', values={'US': 'United States', 'PT': 'Portugal'})],
+                      [Attribute(name='TIME_PERIOD', desc='Time', values='DateTime'),
+                       Attribute(name='OBS_VALUE', desc='Value', values='Double')],
+                      [], {})
+    available = {'US': series(['2020', '2021', '2022'], [1., 2., 3.], FREQ='A', REF_AREA='US'),
+                 'PT': series(['2015', '2016', '2022'], [4., 5., 6.], FREQ='A', REF_AREA='PT')}
+    
+    def get_data(FREQ=None, REF_AREA=None, *, start='1900', end='2100', engine=None):
+        areas = [area for area in available if not any(REF_AREA or []) or area in REF_AREA]
+        dataframes = [available[area][available[area]['TIME_PERIOD'] >= start].reset_index(drop=True) for area in areas]
+        for area, dataframe in zip(areas, dataframes):
+            dataframe.attrs = dict(available[area].attrs)
+        return dataframes
+    
+    monkeypatch.setattr(dataset, 'get_data', get_data)
+    store = SeriesStore(tmp_path)
+    store.merge('IFS', dataset.parameters, [available['US'].iloc[:2].copy()], '1900')
+    
+    report = dataset.refresh(store, FREQ='A', REF_AREA='')
+    assert report.new_series == ['A.PT']
+    assert store.get('IFS', 'A.PT')['TIME_PERIOD'].tolist() == ['2015', '2016', '2022']
+    assert store.get('IFS', 'A.US')['TIME_PERIOD'].tolist() == ['2020', '2021', '2022']
+
+def test_refresh_per_last_period(api, rate_limiter, tmp_path):
+    """Test that each stored series is refreshed from its own last period's year, so stale series don't widen the others'."""
+    from wrapper import IMFWrapper
+    
+    store = SeriesStore(tmp_path)
+    with IMFWrapper(rate_limiter=rate_limiter) as imf:
+        ifs = imf.get_dataset('IFS')
+        store.merge('IFS', ifs.parameters, [*ifs.get_data(FREQ='A', REF_AREA='PT', end='2003'), *ifs.get_data(FREQ='A', REF_AREA='US')], '1900')
+        
+        api.urls.clear()
+        report = ifs.refresh(store, FREQ='A', REF_AREA=['US', 'PT'])
+        
+        assert sorted(url.split('/IFS/')[1] for url in api.urls) == ['A.PT?startPeriod=2003&endPeriod=2100', 
+                                                                     'A.US?startPeriod=2009&endPeriod=2100']
+        assert report.new_observations == {'A.PT': 6} and not report.revised_observations
+        
+        api.urls.clear()
+        report = ifs.refresh(store, FREQ='A', REF_AREA='')
+        
+        assert sorted(url.split('/IFS/')[1] for url in api.urls) == ['A.?startPeriod=2009&endPeriod=2100', 
+                                                                     'A.GB?startPeriod=1900&endPeriod=2100']
+        assert report.new_series == ['A.GB'] and len(store.get('IFS', 'A.GB')) == 10
@@ -0,0 +1,23 @@
+import json
+import pytest
+from streaming import iter_series
+from exceptions import WrapperException
+
+pytest.importorskip('ijson')
+
+def chunked(data: dict, size: int = 7):
+    raw = json.dumps(data).encode()
+    return (raw[k:k+size] for k in range(0, len(raw), size))
+
+def test_iter_series():
+    """Test that series are parsed one by one from the chunks of a response."""
+    series = [{'@FREQ': 'A', 'Obs': [{'@OBS_VALUE': '1'}]}, {'@FREQ': 'Q', 'Obs': {'@OBS_VALUE': '2'}}]
+    
+    assert list(iter_series(chunked({'CompactData': {'DataSet': {'Series': series}}}))) == series
+    assert list(iter_series(chunked({'CompactData': {'DataSet': {'Series': series[0]}}}))) == series[:1]
+    assert list(iter_series(chunked({'CompactData': {'DataSet': {}}}))) == []
+
+def test_iter_series_invalid():
+    """Test that responses without data are rejected."""
+    with pytest.raises(WrapperException):
+        list(iter_series(chunked({'Error': {}})))
@@ -0,0 +1,25 @@
+from url import URLFactory
+
+def test_compact_data_split():
+    """Test that too large requests are split into urls within the maximum size, covering all arguments."""
+    areas = [f"A{i:02d}" for i in range(60)]
+    urls = URLFactory.compact_data_split('DOTS', ['A', areas, ['US', 'PT']], max_size=323)
+    
+    assert len(urls) == 2
+    assert all(len(url) <= 323 for url in urls)
+    
+    requested = {area for url in urls for area in url.split('/')[-1].split('?')[0].split('.')[1].split('+')}
+    assert requested == set(areas)
+
+def test_compact_data_split_fitting():
+    """Test that requests within the maximum size are not split."""
+    assert URLFactory.compact_data_split('PCPS', ['A', '', 'PALLFNF']) == [URLFactory.compact_data('PCPS', ['A', '', 'PALLFNF'])]
+
+def test_compact_data_split_periods():
+    """Test that requests are split into consecutive shards of periods, aligned to their years."""
+    urls = URLFactory.compact_data_split('IFS', ['A', 'US', ''], start='1995-03', end='2021', years_per_shard=10)
+    
+    assert [url.split('?')[1] for url in urls] == ['startPeriod=1995-03&endPeriod=1999',
+                                                   'startPeriod=2000&endPeriod=2009',
+                                                   'startPeriod=2010&endPeriod=2019',
+                                                   'startPeriod=2020&endPeriod=2021']
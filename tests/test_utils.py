@@ -0,0 +1,18 @@
+import json
+import httpx
+import utils
+
+def test_json_decoder():
+    """Test that responses are decoded with the set decoder, and that the default one is restored."""
+    response = httpx.Response(200, content=b'{"CompactData": {"DataSet": {}}}')
+    assert utils.decode_json(response) == {'CompactData': {'DataSet': {}}}
+    
+    decoded = []
+    utils.set_json_decoder(lambda content: decoded.append(content) or json.loads(content))
+    try:
+        utils.decode_json(response)
+    finally:
+        utils.set_json_decoder(None)
+    
+    assert decoded == [response.content]
+    assert utils.json_decoder is utils.default_json_decoder
@@ -1,7 +1,127 @@
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
 import pytest
-from src.wrapper import IMFWrapper
+from src.wrapper import IMFWrapper, AsyncIMFWrapper
+from cache import DiskCache
+from client import IMFClient, AsyncIMFClient
+from url import URLFactory
 
 def test_initialization():
     """Test the initialization of the wrapper class."""
     imf = IMFWrapper()
-    assert imf.datasets is not None
\ No newline at end of file
+    assert imf.datasets is not None
+
+def test_given_client_left_open(api, rate_limiter):
+    """Test that the wrappers only close the clients they created, leaving given ones to their owners."""
+    with IMFClient(rate_limiter) as client:
+        with IMFWrapper(client=client):
+            pass
+        assert not client._client.is_closed
+        assert client.get_jsons([URLFactory.dataflow()] * 2)
+    
+    with IMFWrapper(rate_limiter=rate_limiter) as imf:
+        pass
+    assert imf._client._client.is_closed
+    
+    async def main():
+        async with AsyncIMFClient(rate_limiter) as client:
+            async with AsyncIMFWrapper(client=client):
+                pass
+            assert not client._client.is_closed
+    
+    asyncio.run(main())
+
+def test_async_data_equals_sync(api, rate_limiter):
+    """Test that the async wrapper gets the same data as the sync one, for each engine and output."""
+    arguments = [({'REF_AREA': ['US', 'PT']}, {}), ({}, {'output': 'long'}), ({'FREQ': 'A'}, {'engine': 'pydantic'}),
+                 ({}, {'start': '2005', 'shard_periods': 2})]
+    
+    with IMFWrapper(rate_limiter=rate_limiter) as imf:
+        ifs = imf.get_dataset('IFS')
+        expected = [ifs.get_data(**params, **options) for params, options in arguments]
+    
+    async def main():
+        async with AsyncIMFWrapper(rate_limiter=rate_limiter) as imf:
+            ifs = await imf.get_dataset('IFS')
+            return await asyncio.gather(*(ifs.aget_data(**params, **options) for params, options in arguments))
+    
+    for result, expected_result in zip(asyncio.run(main()), expected):
+        if isinstance(expected_result, list):
+            assert result and len(result) == len(expected_result)
+            for dataframe, expected_dataframe in zip(result, expected_result):
+                assert dataframe.equals(expected_dataframe) and dataframe.attrs == expected_dataframe.attrs
+        else:
+            assert len(result) and result.equals(expected_result)
+
+def test_single_pooled_client(api, rate_limiter):
+    """Test that all the requests of a wrapper (and its datasets) go through a single client, closed with the wrapper."""
+    with IMFWrapper(rate_limiter=rate_limiter) as imf:
+        imf.get_dataset('IFS').get_data(REF_AREA=['US', 'PT'], start='2000', shard_periods=5)
+        imf.get_dataset('DOTS').get_data(FREQ='A')
+    
+    assert len(api.urls) > 5 and len(api.clients) == 1
+    assert api.clients[0].is_closed
+
+def test_models_reused_across_datasets(api, rate_limiter):
+    """Test that datasets with identical components (even from different wrappers) share their generated models."""
+    with IMFWrapper(rate_limiter=rate_limiter) as imf, IMFWrapper(rate_limiter=rate_limiter) as other:
+        ifs, dots = imf.get_dataset('IFS'), other.get_dataset('DOTS')
+        
+        assert ifs is not dots
+        assert ifs.SeriesItemDynamic is dots.SeriesItemDynamic
+        assert ifs.CompactDataResponse is dots.CompactDataResponse
+
+def test_lazy_startup_imports():
+    """Test that importing the wrapper, and creating it lazily, imports neither pandas nor pydantic."""
+    code = ("import sys; from wrapper import IMFWrapper; IMFWrapper(lazy=True).close(); "
+            "print(*(module for module in ('pandas', 'pydantic') if module in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], cwd=Path(__file__).parent.parent / 'src', 
+                            capture_output=True, text=True, check=True)
+    
+    assert result.stdout.strip() == ''
+
+def test_prefetch_structures(api, rate_limiter):
+    """Test that prefetching creates the datasets, skipping (and returning) the ones failing."""
+    progress = []
+    with IMFWrapper(rate_limiter=rate_limiter) as imf:
+        failed = imf.prefetch_structures(['IFS', 'DOTS', 'BAD'], progress=lambda done, total: progress.append((done, total)))
+        
+        assert list(failed) == ['BAD']
+        assert set(imf._datasets_instances) == {'IFS', 'DOTS'}
+        assert progress == [(1, 3), (2, 3), (3, 3)]
+    
+    async def main():
+        async with AsyncIMFWrapper(rate_limiter=rate_limiter) as imf:
+            return await imf.prefetch_structures(['IFS', 'BAD'])
+    
+    assert list(asyncio.run(main())) == ['BAD']
+
+def test_catalog_revalidated(api, rate_limiter, tmp_path):
+    """Test that a cached catalog is used at once and, once stale, revalidated in the background (conditionally)."""
+    cache = DiskCache(tmp_path, ttl=None, max_bytes=None)
+    
+    with IMFWrapper(rate_limiter=rate_limiter, catalog_cache=cache) as imf:
+        assert 'IFS' in imf.datasets
+    fetched_at = cache.get(IMFWrapper.CATALOG_KEY).fetched_at
+    
+    with IMFWrapper(rate_limiter=rate_limiter, catalog_cache=cache) as imf:
+        assert 'IFS' in imf.datasets
+    assert len(api.urls) == 1
+    
+    with IMFWrapper(rate_limiter=rate_limiter, catalog_cache=cache, catalog_ttl=0) as imf:
+        assert 'IFS' in imf.datasets
+        assert imf._refresh_thread is not None
+    assert len(api.urls) == 2 and api.not_modified == 1
+    assert cache.get(IMFWrapper.CATALOG_KEY).fetched_at > fetched_at
+    
+    async def main():
+        async with AsyncIMFWrapper(rate_limiter=rate_limiter, catalog_cache=cache, catalog_ttl=0) as imf:
+            assert 'IFS' in imf.datasets
+            assert imf._refresh_task is not None
+    
+    api.etag = '"2"'
+    asyncio.run(main())
+    assert len(api.urls) == 3 and api.not_modified == 1
+    assert cache.get(IMFWrapper.CATALOG_KEY).etag == '"2"'